@@ -1,6 +1,9 @@
 import os
 import re
 import json
+import time
+import asyncio
+import functools
 import torch
 import librosa
 import soundfile
@@ -12,8 +15,12 @@ import torch
 
 from . import utils
 from . import commons
+from . import pipeline
+from . import document
 from .models import SynthesizerTrn
-from .split_utils import split_sentence
+from .text import get_bert
+from .text.symbols import language_tone_start_map
+from .split_utils import split_sentence, split_sentence_stream, sentence_splitter
 from .mel_processing import spectrogram_torch, spectrogram_torch_conv
 from .download_utils import load_or_download_config, load_or_download_model
 
@@ -23,8 +30,16 @@ class TTS(nn.Module):
                 device='auto',
                 use_hf=True,
                 config_path=None,
-                ckpt_path=None):
+                ckpt_path=None,
+                inference_only=False,
+                optimize=True):
+        """inference_only builds the model without the modules only training
+        and voice conversion use, and loads only the weights it needs.
+        optimize=False skips optimize_for_inference, e.g. to keep training
+        the loaded model."""
         super().__init__()
+        # what a document mode worker process needs to load the same model
+        self.init_kwargs = dict(language=language, use_hf=use_hf, config_path=config_path, ckpt_path=ckpt_path)
         if device == 'auto':
             device = 'cpu'
             if torch.cuda.is_available(): device = 'cuda'
@@ -46,6 +61,7 @@ class TTS(nn.Module):
             n_speakers=hps.data.n_speakers,
             num_tones=num_tones,
             num_languages=num_languages,
+            inference_only=inference_only,
             **hps.model,
         ).to(device)
 
@@ -56,12 +72,24 @@ class TTS(nn.Module):
         self.device = device
     
         # load state_dict
-        checkpoint_dict = load_or_download_model(language, device, use_hf=use_hf, ckpt_path=ckpt_path)
-        self.model.load_state_dict(checkpoint_dict['model'], strict=True)
+        checkpoint_dict = load_or_download_model(language, device, use_hf=use_hf, ckpt_path=ckpt_path, mmap=inference_only)
+        state_dict = checkpoint_dict['model']
+        if inference_only:
+            # the weights of the left out posterior encoder are never read from the file
+            state_dict = {k: v for k, v in state_dict.items() if not k.startswith('enc_q.')}
+        self.model.load_state_dict(state_dict, strict=True)
+        del checkpoint_dict, state_dict
+        if optimize:
+            self.optimize_for_inference()
         
         language = language.split('_')[0]
         self.language = 'ZH_MIX_EN' if language == 'ZH' else language # we support a ZH_MIX_EN model
 
+    def optimize_for_inference(self):
+        """Folds weight norm and the text encoder embeddings into the weights
+        and freezes the model, see SynthesizerTrn.optimize_for_inference."""
+        self.model.optimize_for_inference()
+
     @staticmethod
     def audio_numpy_concat(segment_data_list, sr, speed=1.):
         audio_segments = []
@@ -80,54 +108,272 @@ class TTS(nn.Module):
             print(" > ===========================")
         return texts
 
-    def tts_to_file(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False,):
+    def get_text_inputs(self, text):
+        return self.get_text_inputs_batch([text])[0]
+
+    def get_text_inputs_batch(self, texts):
         language = self.language
-        texts = self.split_sentences_into_pieces(text, language, quiet)
+        if language in ['EN', 'ZH_MIX_EN']:
+            texts = [re.sub(r'([a-z])([A-Z])', r'\1 \2', t) for t in texts]
+        return utils.get_texts_for_tts_infer(texts, language, self.hps, self.device, self.symbol_to_id)
+
+    def get_phoneme_inputs(self, phones, tones, word2ph=None, bert=None, norm_text=None):
+        """get_text_inputs for a sentence that is already phonemized.
+
+        `phones`, `tones` and `word2ph` are what clean_text returns for it,
+        e.g. from an earlier run or a lexicon service, so text normalization
+        and g2p are skipped. `bert` is the BERT feature get_bert returns for
+        the sentence (one column per phone, blanks included). Without it, the
+        feature is computed from `norm_text` and `word2ph` if they are given,
+        and is zero otherwise, which needs no frontend at all. Raises a
+        ValueError if the phones or tones do not fit this model.
+        """
+        language = self.language
+        utils.check_phonemes(phones, tones, word2ph, self.symbol_to_id)
+        if len(tones) and max(tones) + language_tone_start_map[language] >= self.hps.num_tones:
+            raise ValueError(f"tones {sorted(set(tones))} out of range for {language}")
+        phone, tone, language_ids, word2ph = utils.phonemes_to_sequence(phones, tones, word2ph, language, self.hps, self.symbol_to_id)
+        if bert is None and norm_text is not None and word2ph is not None and not getattr(self.hps.data, "disable_bert", False):
+            bert = get_bert(norm_text, word2ph, language, self.device)
+        if bert is not None and bert.shape[-1] != len(phone):
+            raise ValueError(f"bert has {bert.shape[-1]} columns for {len(phone)} phones")
+        return utils.sequence_to_infer_inputs(bert, phone, tone, language_ids, language)
+
+    def tts_phonemes(self, sentences, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, format=None, batch_size=1):
+        """tts_to_file for phonemized sentences.
+
+        `sentences` is a list of dicts with the get_phoneme_inputs arguments
+        ('phones', 'tones' and optionally 'word2ph', 'bert', 'norm_text'),
+        one per sentence.
+        """
+        inputs = [self.get_phoneme_inputs(**sentence) for sentence in sentences]
         audio_list = []
+        for i in range(0, len(inputs), batch_size):
+            audio_list += self._synthesize(inputs[i:i + batch_size], speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed)
+        audio = np.concatenate(audio_list) if audio_list else np.zeros(0, dtype=np.float32)
+        return self._save(audio, output_path, format)
+
+    def _iter_text_input_groups(self, texts, bert_batch_size):
+        # the frontend runs BERT once per group of bert_batch_size sentences
+        for i in range(0, len(texts), bert_batch_size):
+            yield self.get_text_inputs_batch(texts[i:i + bert_batch_size])
+
+    def _to_device(self, inputs, speaker_id):
+        bert, ja_bert, x_tst, x_tst_lengths, tones, lang_ids = utils.pad_text_for_tts_infer(inputs)
+        device = self.device
+        speakers = torch.LongTensor([speaker_id] * len(inputs))
+        return tuple(
+            None if t is None else t.to(device)
+            for t in (x_tst, x_tst_lengths, speakers, tones, lang_ids, bert, ja_bert)
+        )
+
+    def infer_batch(self, inputs, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0):
+        """Synthesizes several sentences with one padded infer call.
+
+        `inputs` is a list of get_text_inputs results. Returns one float numpy
+        array per sentence, trimmed to its own length using y_mask.
+        """
+        hop_length = self.hps.data.hop_length
+        with torch.no_grad():
+            model_inputs = self._to_device(inputs, speaker_id)
+            o, _, y_mask, _ = self.model.infer(
+                    *model_inputs,
+                    sdp_ratio=sdp_ratio,
+                    noise_scale=noise_scale,
+                    noise_scale_w=noise_scale_w,
+                    length_scale=1. / speed,
+                )
+            y_lengths = y_mask.sum([1, 2]).long() * hop_length
+            audios = [o[i, 0, :y_lengths[i]].data.cpu().float().numpy() for i in range(len(inputs))]
+            del model_inputs, o, y_mask
+        return audios
+
+    def infer_chunks(self, text_inputs, speaker_id, chunk_size=32, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0):
+        """Synthesizes one sentence and yields its audio every `chunk_size` latent frames.
+
+        The decoder runs on overlapping windows (see Generator.forward_chunked),
+        so the first chunk is ready before the rest of the sentence is decoded.
+        """
+        with torch.no_grad():
+            model_inputs = self._to_device([text_inputs], speaker_id)
+            for o in self.model.infer_iter(
+                    *model_inputs,
+                    chunk_size=chunk_size,
+                    sdp_ratio=sdp_ratio,
+                    noise_scale=noise_scale,
+                    noise_scale_w=noise_scale_w,
+                    length_scale=1. / speed,
+                ):
+                yield o[0, 0].data.cpu().float().numpy()
+
+    @staticmethod
+    def _to_pcm(audio, dtype):
+        if dtype == 'int16':
+            return (np.clip(audio, -1., 1.) * 32767).astype(np.int16)
+        return audio.astype(np.float32)
+
+    def tts_iter(self, text, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, position=None, quiet=False, batch_size=1, dtype='float32', chunk_size=None, bert_batch_size=None, prefetch=0, stats=None):
+        """Yields the audio of each sentence as soon as it is synthesized.
+
+        Every chunk is loudness-normalized and followed by the same silence
+        audio_numpy_concat inserts, so concatenating the chunks gives the
+        tts_to_file output. `dtype` is 'float32' or 'int16' PCM.
+
+        With `chunk_size` set, each sentence is streamed every `chunk_size`
+        latent frames instead. Loudness normalization needs the whole sentence,
+        so those chunks are the raw model output.
+
+        `bert_batch_size` sentences share one BERT forward (default: batch_size).
+        Larger values are faster overall but delay the first chunk.
+
+        With `prefetch` > 0, the frontend (text normalization, g2p and BERT)
+        of the next sentences runs on a worker thread, at most `prefetch`
+        groups of `bert_batch_size` sentences ahead, while the acoustic model
+        synthesizes the current ones. Pass a pipeline.PipelineStats as
+        `stats` to get the busy time of the 'frontend' and 'acoustic' stages.
+        """
+        assert dtype in ['float32', 'int16'], dtype
+        if stats is not None:
+            stats.start = time.perf_counter()
+        language = self.language
+        texts = self.split_sentences_into_pieces(text, language, quiet)
+        # batch_size > 1 pads that many sentences into a single infer call
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        groups = self._iter_text_input_groups(texts, bert_batch_size or batch_size)
+        if stats is not None:
+            groups = pipeline.timed(groups, stats, 'frontend')
+        if prefetch:
+            groups = pipeline.prefetch(groups, prefetch)
+        text_inputs = (inputs for group in groups for inputs in group)
         if pbar:
-            tx = pbar(texts)
+            tx = pbar(batches)
         else:
             if position:
-                tx = tqdm(texts, position=position)
+                tx = tqdm(batches, position=position)
             elif quiet:
-                tx = texts
+                tx = batches
             else:
-                tx = tqdm(texts)
-        for t in tx:
-            if language in ['EN', 'ZH_MIX_EN']:
-                t = re.sub(r'([a-z])([A-Z])', r'\1 \2', t)
-            device = self.device
-            bert, ja_bert, phones, tones, lang_ids = utils.get_text_for_tts_infer(t, language, self.hps, device, self.symbol_to_id)
-            with torch.no_grad():
-                x_tst = phones.to(device).unsqueeze(0)
-                tones = tones.to(device).unsqueeze(0)
-                lang_ids = lang_ids.to(device).unsqueeze(0)
-                bert = bert.to(device).unsqueeze(0)
-                ja_bert = ja_bert.to(device).unsqueeze(0)
-                x_tst_lengths = torch.LongTensor([phones.size(0)]).to(device)
-                del phones
-                speakers = torch.LongTensor([speaker_id]).to(device)
-                audio = self.model.infer(
-                        x_tst,
-                        x_tst_lengths,
-                        speakers,
-                        tones,
-                        lang_ids,
-                        bert,
-                        ja_bert,
-                        sdp_ratio=sdp_ratio,
-                        noise_scale=noise_scale,
-                        noise_scale_w=noise_scale_w,
-                        length_scale=1. / speed,
-                    )[0][0, 0].data.cpu().float().numpy()
-                del x_tst, tones, lang_ids, bert, ja_bert, x_tst_lengths, speakers
-                
+                tx = tqdm(batches)
+        try:
+            for batch in tx:
+                inputs = [next(text_inputs) for _ in batch]
+                audios = self._synthesize(inputs, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, dtype=dtype, chunk_size=chunk_size)
+                if stats is not None:
+                    audios = pipeline.timed(audios, stats, 'acoustic')
+                yield from audios
+        finally:
+            # stops the frontend worker when the caller stops early
+            groups.close()
+        if stats is not None:
+            stats.end = time.perf_counter()
+        torch.cuda.empty_cache()
+
+    def _synthesize(self, inputs, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, dtype='float32', chunk_size=None):
+        """Yields the tts_iter chunks of a batch of get_text_inputs results."""
+        sr = self.hps.data.sampling_rate
+        if chunk_size is not None:
+            for sentence_inputs in inputs:
+                for audio in self.infer_chunks(sentence_inputs, speaker_id, chunk_size=chunk_size, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed):
+                    yield self._to_pcm(audio, dtype)
+                # same inter-sentence silence as audio_numpy_concat
+                yield self._to_pcm(np.zeros(int((sr * 0.05) / speed), dtype=np.float32), dtype)
+            return
+        audios = self.infer_batch(inputs, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed)
+        for audio in audios:
             # Ref:
             # https://github.com/myshell-ai/MeloTTS/pull/221
-            audio_list.append(utils.fix_loudness(audio,self.hps.data.sampling_rate))
+            audio = utils.fix_loudness(audio, sr)
+            yield self._to_pcm(self.audio_numpy_concat([audio], sr=sr, speed=speed), dtype)
+
+    def _synthesize_sentence(self, sentence, speaker_id, quiet=False, **kwargs):
+        if not quiet:
+            print(f" > {sentence}")
+        yield from self._synthesize(self.get_text_inputs_batch([sentence]), speaker_id, **kwargs)
+
+    def tts_stream(self, text_stream, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, quiet=False, dtype='float32', chunk_size=None):
+        """tts_iter over a text that arrives in pieces, e.g. the deltas of a streaming LLM reply.
+
+        `text_stream` is an iterable of strings. Sentences are split from it
+        with the split_sentence rules as the text comes in, and each one is
+        synthesized as soon as it is complete, so the first audio is ready
+        long before the text ends. The chunks are the ones tts_iter yields
+        for the whole text.
+        """
+        assert dtype in ['float32', 'int16'], dtype
+        kwargs = dict(sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, quiet=quiet, dtype=dtype, chunk_size=chunk_size)
+        for sentence in split_sentence_stream(text_stream, language_str=self.language):
+            yield from self._synthesize_sentence(sentence, speaker_id, **kwargs)
         torch.cuda.empty_cache()
-        audio = self.audio_numpy_concat(audio_list, sr=self.hps.data.sampling_rate, speed=speed)
 
+    async def tts_stream_async(self, text_stream, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, quiet=False, dtype='float32', chunk_size=None):
+        """tts_stream as an async generator, over an async iterable of strings.
+
+        The text stream keeps being read while a sentence is synthesized.
+        Synthesis runs in a worker thread, so it does not block the event loop.
+        """
+        assert dtype in ['float32', 'int16'], dtype
+        kwargs = dict(sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, quiet=quiet, dtype=dtype, chunk_size=chunk_size)
+        sentences = asyncio.Queue()
+
+        async def read():
+            splitter = sentence_splitter(language_str=self.language)
+            try:
+                async for fragment in text_stream:
+                    for sentence in splitter.feed(fragment):
+                        sentences.put_nowait(sentence)
+                for sentence in splitter.close():
+                    sentences.put_nowait(sentence)
+            finally:
+                sentences.put_nowait(None)
+
+        reader = asyncio.ensure_future(read())
+        try:
+            while True:
+                sentence = await sentences.get()
+                if sentence is None:
+                    break
+                chunks = self._synthesize_sentence(sentence, speaker_id, **kwargs)
+                while True:
+                    chunk = await asyncio.to_thread(next, chunks, None)
+                    if chunk is None:
+                        break
+                    yield chunk
+            # raises the error the text stream ended with, if any
+            await reader
+        finally:
+            reader.cancel()
+        torch.cuda.empty_cache()
+
+    def worker_factory(self):
+        """A picklable callable that loads this model on the CPU of a worker process.
+
+        Workers only synthesize, so they load the inference-only model.
+        """
+        return functools.partial(TTS, device='cpu', inference_only=True, **self.init_kwargs)
+
+    def tts_document(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, format=None, quiet=False, batch_size=1, n_workers=None, threads_per_worker=2, shard_size=8, seed=None, stats=None):
+        """tts_to_file for long texts, on a pool of CPU worker processes.
+
+        The sentences are synthesized in shards of `shard_size` consecutive
+        sentences by `n_workers` processes, each holding its own model and
+        pinned to its own `threads_per_worker` cores (by default, all cores
+        are used). The audio is put back together in order, with the same
+        silence between sentences as tts_to_file. Pass a
+        document.DocumentStats as `stats` to get the throughput and the
+        busy time of each worker. See document.synthesize_document.
+        """
+        texts = self.split_sentences_into_pieces(text, self.language, quiet)
+        audio = document.synthesize_document(
+            self.worker_factory(), texts, speaker_id, self.hps.data.sampling_rate,
+            n_workers=n_workers, threads_per_worker=threads_per_worker, shard_size=shard_size,
+            batch_size=batch_size, seed=seed, stats=stats,
+            sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed,
+        )
+        if stats is not None and not quiet:
+            print(stats)
+        return self._save(audio, output_path, format)
+
+    def _save(self, audio, output_path, format):
         if output_path is None:
             return audio
         else:
@@ -135,3 +381,8 @@ class TTS(nn.Module):
                 soundfile.write(output_path, audio, self.hps.data.sampling_rate, format=format)
             else:
                 soundfile.write(output_path, audio, self.hps.data.sampling_rate)
+
+    def tts_to_file(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False, batch_size=1, bert_batch_size=32, prefetch=1, stats=None):
+        audio_list = list(self.tts_iter(text, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, pbar=pbar, position=position, quiet=quiet, batch_size=batch_size, bert_batch_size=bert_batch_size, prefetch=prefetch, stats=stats))
+        audio = np.concatenate(audio_list) if audio_list else np.zeros(0, dtype=np.float32)
+        return self._save(audio, output_path, format)
@@ -1,4 +1,6 @@
 import math
+from functools import lru_cache
+
 import torch
 from torch import nn
 from torch.nn import functional as F
@@ -201,6 +203,17 @@ class Decoder(nn.Module):
         return x
 
 
+@lru_cache(maxsize=None)
+def _relative_diagonals(length, window_size):
+    """(offset, rows) of the diagonals of a [length, length] score matrix within
+    window_size of the main one: the query rows of the elements (i, i + offset)."""
+    return tuple(
+        (offset, slice(max(0, -offset), length - max(0, offset)))
+        for offset in range(-window_size, window_size + 1)
+        if abs(offset) < length
+    )
+
+
 class MultiHeadAttention(nn.Module):
     def __init__(
         self,
@@ -260,11 +273,62 @@ class MultiHeadAttention(nn.Module):
         k = self.conv_k(c)
         v = self.conv_v(c)
 
-        x, self.attn = self.attention(q, k, v, mask=attn_mask)
+        if self.training or self.block_length is not None:
+            x, self.attn = self.attention(q, k, v, mask=attn_mask)
+        else:
+            x, self.attn = self.inference_attention(q, k, v, mask=attn_mask), None
 
         x = self.conv_o(x)
         return x
 
+    def inference_attention(self, query, key, value, mask=None):
+        """attention without dropout and without the attention map.
+
+        The relative position terms only touch the 2 * window_size + 1
+        diagonals around the main one, so they are added diagonal by diagonal
+        instead of through [t, 2t - 1] relative matrices. Without a window the
+        scores go to scaled_dot_product_attention with an additive bias.
+        """
+        # reshape [b, d, t] -> [b, n_h, t, d_k]
+        b, d, t_s, t_t = (*key.size(), query.size(2))
+        query = query.view(b, self.n_heads, self.k_channels, t_t).transpose(2, 3)
+        key = key.view(b, self.n_heads, self.k_channels, t_s).transpose(2, 3)
+        value = value.view(b, self.n_heads, self.k_channels, t_s).transpose(2, 3)
+
+        if self.window_size is None:
+            bias = None
+            if self.proximal_bias:
+                assert t_s == t_t, "Proximal bias is only available for self-attention."
+                bias = self._attention_bias_proximal(t_s).to(device=query.device, dtype=query.dtype)
+            if mask is not None:
+                mask_bias = torch.zeros(mask.size(), device=query.device, dtype=query.dtype)
+                mask_bias = mask_bias.masked_fill(mask == 0, -1e4)
+                bias = mask_bias if bias is None else bias + mask_bias
+            output = F.scaled_dot_product_attention(query, key, value, attn_mask=bias)
+            return output.transpose(2, 3).contiguous().view(b, d, t_t)
+
+        assert t_s == t_t, "Relative attention is only available for self-attention."
+        query = query / math.sqrt(self.k_channels)
+        scores = torch.matmul(query, key.transpose(-2, -1))
+        diagonals = _relative_diagonals(t_s, self.window_size)
+        # [b, n_h, t, 2 * window_size + 1], the logits of the keys around each query
+        rel_logits = self._matmul_with_relative_keys(query, self.emb_rel_k)
+        for offset, rows in diagonals:
+            scores.diagonal(offset, -2, -1).add_(rel_logits[:, :, rows, offset + self.window_size])
+        if self.proximal_bias:
+            scores = scores + self._attention_bias_proximal(t_s).to(
+                device=scores.device, dtype=scores.dtype
+            )
+        if mask is not None:
+            scores = scores.masked_fill(mask == 0, -1e4)
+        p_attn = F.softmax(scores, dim=-1)  # [b, n_h, t_t, t_s]
+        output = torch.matmul(p_attn, value)
+        relative_weights = p_attn.new_zeros(b, self.n_heads, t_t, 2 * self.window_size + 1)
+        for offset, rows in diagonals:
+            relative_weights[:, :, rows, offset + self.window_size] = p_attn.diagonal(offset, -2, -1)
+        output = output + self._matmul_with_relative_values(relative_weights, self.emb_rel_v)
+        return output.transpose(2, 3).contiguous().view(b, d, t_t)
+
     def attention(self, query, key, value, mask=None):
         # reshape [b, d, t] -> [b, n_h, t, d_k]
         b, d, t_s, t_t = (*key.size(), query.size(2))
@@ -25,6 +25,17 @@ def intersperse(lst, item):
     return result
 
 
+def intersperse_word2ph(word2ph):
+    """word2ph of a phone sequence interspersed with blanks.
+
+    Each word also owns the blank after every phone, and the first word owns
+    the leading blank. Returns a new list.
+    """
+    word2ph = [n * 2 for n in word2ph]
+    word2ph[0] += 1
+    return word2ph
+
+
 def kl_divergence(m_p, logs_p, m_q, logs_q):
     """KL(P||Q)"""
     kl = (logs_q - logs_p) - 0.5
@@ -142,6 +153,34 @@ def generate_path(duration, mask):
     return path
 
 
+def duration_to_index(duration, t_y):
+    """The phone each frame of generate_path(duration, mask) is aligned to.
+
+    duration: [b, 1, t_x], whole numbers
+    Returns index [b, t_y] and valid [b, t_y]. Frames after the last phone
+    of their entry are not aligned to any phone; their index is clamped
+    into range and valid is False.
+    """
+    t_x = duration.size(-1)
+    cum_duration = torch.cumsum(duration, -1).squeeze(1).contiguous()
+    frames = torch.arange(t_y, dtype=cum_duration.dtype, device=duration.device)
+    frames = frames.expand(cum_duration.size(0), t_y).contiguous()
+    # the first phone that ends after the frame
+    index = torch.searchsorted(cum_duration, frames, right=True)
+    valid = index < t_x
+    return index.clamp_max(t_x - 1), valid
+
+
+def expand_by_index(x, index, valid):
+    """x [b, d, t_x] expanded to the frames [b, d, t_y], zero where not valid.
+
+    Equals torch.matmul(path, x.transpose(1, 2)).transpose(1, 2) for the
+    path of generate_path, without building it.
+    """
+    expanded = torch.gather(x, 2, index.unsqueeze(1).expand(-1, x.size(1), -1))
+    return torch.where(valid.unsqueeze(1), expanded, torch.zeros_like(expanded))
+
+
 def clip_grad_value_(parameters, clip_value, norm_type=2):
     if isinstance(parameters, torch.Tensor):
         parameters = [parameters]
@@ -153,9 +153,7 @@ class TextAudioSpeakerLoader(torch.utils.data.Dataset):
             phone = commons.intersperse(phone, 0)
             tone = commons.intersperse(tone, 0)
             language = commons.intersperse(language, 0)
-            for i in range(len(word2ph)):
-                word2ph[i] = word2ph[i] * 2
-            word2ph[0] += 1
+            word2ph = commons.intersperse_word2ph(word2ph)
         bert_path = wav_path.replace(".wav", ".bert.pt")
         try:
             bert = torch.load(bert_path)
@@ -0,0 +1,128 @@
+"""Document mode: synthesizes a long text on a pool of worker processes.
+
+Each worker process loads its own TTS model and runs torch on its own slice
+of the CPU cores, so the workers do not compete for threads. The sentences
+are sent to the workers in shards of consecutive sentences, and the audio of
+the shards is put back together in text order.
+"""
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+
+import numpy as np
+import torch
+
+# the TTS model of a worker process
+_tts = None
+
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+
+def partition_cores(cores, n_workers):
+    """Splits cores into n_workers contiguous slices, sharing cores only if there are too few."""
+    if n_workers >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(n_workers)]
+    return [[int(c) for c in s] for s in np.array_split(cores, n_workers)]
+
+
+class DocumentStats:
+    """Throughput of a document and busy time per worker process."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end = None
+        self.audio_seconds = 0.
+        self.workers = defaultdict(lambda: {'cores': [], 'shards': 0, 'sentences': 0, 'busy': 0.})
+
+    @property
+    def wall(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def throughput(self):
+        """Seconds of audio synthesized per second of wall time."""
+        return self.audio_seconds / self.wall
+
+    def add(self, worker, audio_seconds):
+        stats = self.workers[worker['pid']]
+        stats['cores'] = worker['cores']
+        stats['shards'] += 1
+        stats['sentences'] += worker['sentences']
+        stats['busy'] += worker['busy']
+        self.audio_seconds += audio_seconds
+
+    def __str__(self):
+        wall = self.wall
+        lines = [f'{self.audio_seconds:.1f} s of audio in {wall:.1f} s ({self.throughput:.2f}x real time), {len(self.workers)} workers']
+        for pid, stats in sorted(self.workers.items()):
+            lines.append(
+                f'  pid {pid} on cores {stats["cores"]}: {stats["sentences"]} sentences in {stats["shards"]} shards, '
+                f'busy {stats["busy"]:.1f} s ({stats["busy"] / wall:.0%})'
+            )
+        return '\n'.join(lines)
+
+
+def _init_worker(tts_factory, cores_queue):
+    global _tts
+    cores = cores_queue.get()
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    _tts = tts_factory()
+    _tts.cores = cores
+
+
+def _synthesize_shard(args):
+    index, texts, speaker_id, batch_size, seed, kwargs = args
+    start = time.perf_counter()
+    if seed is not None:
+        torch.manual_seed(seed + index)
+    inputs = _tts.get_text_inputs_batch(texts)
+    audios = []
+    for i in range(0, len(inputs), batch_size):
+        audios += _tts._synthesize(inputs[i:i + batch_size], speaker_id, **kwargs)
+    audio = np.concatenate(audios)
+    worker = {'pid': os.getpid(), 'cores': _tts.cores, 'sentences': len(texts), 'busy': time.perf_counter() - start}
+    return audio, worker
+
+
+def synthesize_document(tts_factory, texts, speaker_id, sampling_rate, n_workers=None, threads_per_worker=2, shard_size=8, batch_size=1, seed=None, stats=None, **kwargs):
+    """Synthesizes the sentences texts on worker processes and returns the audio in order.
+
+    tts_factory is a picklable callable that builds the TTS of a worker.
+    Without n_workers, the available cores are split into workers of
+    threads_per_worker cores each. With seed, shard i is synthesized after
+    torch.manual_seed(seed + i), so the output does not depend on which
+    worker gets which shard.
+    """
+    if not texts:
+        return np.zeros(0, dtype=np.float32)
+    cores = available_cores()
+    if n_workers is None:
+        n_workers = max(1, len(cores) // threads_per_worker)
+    n_workers = max(1, min(n_workers, -(-len(texts) // shard_size)))
+    shards = [
+        (index, texts[i:i + shard_size], speaker_id, batch_size, seed, kwargs)
+        for index, i in enumerate(range(0, len(texts), shard_size))
+    ]
+    # spawn, forking a process that already runs torch threads can deadlock
+    ctx = multiprocessing.get_context('spawn')
+    cores_queue = ctx.Queue()
+    for worker_cores in partition_cores(cores, n_workers):
+        cores_queue.put(worker_cores)
+    if stats is None:
+        stats = DocumentStats()
+    stats.start = time.perf_counter()
+    audios = []
+    with ctx.Pool(n_workers, initializer=_init_worker, initargs=(tts_factory, cores_queue)) as pool:
+        # imap returns the shards in order, whichever worker finishes first
+        for audio, worker in pool.imap(_synthesize_shard, shards):
+            audios.append(audio)
+            stats.add(worker, len(audio) / sampling_rate)
+    stats.end = time.perf_counter()
+    return np.concatenate(audios)
@@ -52,7 +52,9 @@ def load_or_download_config(locale, use_hf=True, config_path=None):
             config_path = cached_path(DOWNLOAD_CONFIG_URLS[language])
     return utils.get_hparams_from_file(config_path)
 
-def load_or_download_model(locale, device, use_hf=True, ckpt_path=None):
+def load_or_download_model(locale, device, use_hf=True, ckpt_path=None, mmap=False):
+    """The checkpoint dict. With mmap, tensors are only read from the file
+    when they are used, if the checkpoint is in the zip format."""
     if ckpt_path is None:
         language = locale.split('-')[0].upper()
         if use_hf:
@@ -61,6 +63,12 @@ def load_or_download_model(locale, device, use_hf=True, ckpt_path=None):
         else:
             assert language in DOWNLOAD_CKPT_URLS
             ckpt_path = cached_path(DOWNLOAD_CKPT_URLS[language])
+    if mmap:
+        try:
+            return torch.load(ckpt_path, map_location=device, mmap=True)
+        except RuntimeError:
+            # checkpoints in the legacy format cannot be memory-mapped
+            pass
     return torch.load(ckpt_path, map_location=device)
 
 def load_pretrain_model():
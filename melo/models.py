@@ -8,7 +8,7 @@ from melo import modules
 from melo import attentions
 
 from torch.nn import Conv1d, ConvTranspose1d, Conv2d
-from torch.nn.utils import weight_norm, remove_weight_norm, spectral_norm
+from torch.nn.utils import weight_norm, remove_weight_norm, spectral_norm, remove_spectral_norm
 
 from melo.commons import init_weights, get_padding
 import melo.monotonic_align as monotonic_align
@@ -356,19 +356,55 @@ class TextEncoder(nn.Module):
             gin_channels=self.gin_channels,
         )
         self.proj = nn.Conv1d(hidden_channels, out_channels * 2, 1)
+        self.tone_language_emb = None
+
+    def fold_embeddings(self):
+        """Folds the tone and language embeddings and the biases of the BERT
+        projections into one embedding of the (tone, language) pairs, for
+        inference. The projections are left without bias. Folding again
+        does nothing."""
+        if self.tone_language_emb is not None:
+            return
+        n_languages = self.language_emb.num_embeddings
+        with torch.no_grad():
+            weight = (
+                self.tone_emb.weight.unsqueeze(1)
+                + self.language_emb.weight.unsqueeze(0)
+                + self.bert_proj.bias
+                + self.ja_bert_proj.bias
+            )  # [tones, languages, h]
+        self.tone_language_emb = nn.Embedding.from_pretrained(weight.reshape(-1, self.hidden_channels))
+        self.n_folded_languages = n_languages
+        self.bert_proj.bias = None
+        self.ja_bert_proj.bias = None
+
+    @staticmethod
+    def _project_bert(proj, bert):
+        # None stands for a zero feature, which a 1x1 conv maps to its bias
+        if bert is None:
+            return proj.bias
+        return proj(bert).transpose(1, 2)
 
     def forward(self, x, x_lengths, tone, language, bert, ja_bert, g=None):
-        bert_emb = self.bert_proj(bert).transpose(1, 2)
-        ja_bert_emb = self.ja_bert_proj(ja_bert).transpose(1, 2)
-        x = (
-            self.emb(x)
-            + self.tone_emb(tone)
-            + self.language_emb(language)
-            + bert_emb
-            + ja_bert_emb
-        ) * math.sqrt(
-            self.hidden_channels
-        )  # [b, t, h]
+        if self.tone_language_emb is not None:
+            x = self.emb(x) + self.tone_language_emb(tone * self.n_folded_languages + language)
+            # the biases are folded, a None feature adds nothing
+            for proj, feature in ((self.bert_proj, bert), (self.ja_bert_proj, ja_bert)):
+                if feature is not None:
+                    x = x + proj(feature).transpose(1, 2)
+            x = x * math.sqrt(self.hidden_channels)  # [b, t, h]
+        else:
+            bert_emb = self._project_bert(self.bert_proj, bert)
+            ja_bert_emb = self._project_bert(self.ja_bert_proj, ja_bert)
+            x = (
+                self.emb(x)
+                + self.tone_emb(tone)
+                + self.language_emb(language)
+                + bert_emb
+                + ja_bert_emb
+            ) * math.sqrt(
+                self.hidden_channels
+            )  # [b, t, h]
         x = torch.transpose(x, 1, -1)  # [b, h, t]
         x_mask = torch.unsqueeze(commons.sequence_mask(x_lengths, x.size(2)), 1).to(
             x.dtype
@@ -516,20 +552,26 @@ class Generator(torch.nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, upsample_initial_channel, 1)
 
-    def forward(self, x, g=None):
+    def forward(self, x, g=None, x_mask=None):
+        # x_mask keeps zero-padded batch entries identical to decoding them alone
         x = self.conv_pre(x)
         if g is not None:
             x = x + self.cond(g)
 
         for i in range(self.num_upsamples):
+            if x_mask is not None:
+                x = x * x_mask
             x = F.leaky_relu(x, modules.LRELU_SLOPE)
             x = self.ups[i](x)
+            if x_mask is not None:
+                x_mask = torch.repeat_interleave(x_mask, self.ups[i].stride[0], dim=2)
+                x = x * x_mask
             xs = None
             for j in range(self.num_kernels):
                 if xs is None:
-                    xs = self.resblocks[i * self.num_kernels + j](x)
+                    xs = self.resblocks[i * self.num_kernels + j](x, x_mask)
                 else:
-                    xs += self.resblocks[i * self.num_kernels + j](x)
+                    xs += self.resblocks[i * self.num_kernels + j](x, x_mask)
             x = xs / self.num_kernels
         x = F.leaky_relu(x)
         x = self.conv_post(x)
@@ -537,6 +579,55 @@ class Generator(torch.nn.Module):
 
         return x
 
+    def receptive_field(self):
+        """Number of input frames on each side that can affect one output sample."""
+        field = self.conv_pre.kernel_size[0] // 2
+        rate = 1
+        for i in range(self.num_upsamples):
+            up = self.ups[i]
+            field += math.ceil(up.kernel_size[0] / up.stride[0]) / rate
+            rate *= up.stride[0]
+            field += max(
+                sum(
+                    c.dilation[0] * (c.kernel_size[0] - 1) // 2
+                    for c in self.resblocks[i * self.num_kernels + j].modules()
+                    if isinstance(c, Conv1d)
+                )
+                for j in range(self.num_kernels)
+            ) / rate
+        field += self.conv_post.kernel_size[0] // 2 / rate
+        return math.ceil(field)
+
+    def forward_chunked(self, x, g=None, x_mask=None, chunk_size=32, overlap=2, context=None):
+        """Decodes x in windows of chunk_size frames and yields the audio of each one.
+
+        Every window sees `context` extra frames on both sides (the receptive
+        field by default, which makes the result match forward), and the last
+        `overlap` frames of a window are crossfaded into the next one.
+        """
+        if context is None:
+            context = self.receptive_field()
+        hop = 1
+        for up in self.ups:
+            hop *= up.stride[0]
+        length = x.size(2)
+        tail = None
+        for start in range(0, length, chunk_size):
+            end = min(start + chunk_size, length)
+            lo = max(start - context, 0)
+            hi = min(end + overlap + context, length)
+            o = self(
+                x[:, :, lo:hi],
+                g=g,
+                x_mask=None if x_mask is None else x_mask[:, :, lo:hi],
+            )
+            o = o[:, :, (start - lo) * hop : (min(end + overlap, length) - lo) * hop]
+            if tail is not None:
+                fade = torch.linspace(0, 1, tail.size(2), device=o.device, dtype=o.dtype)
+                o[:, :, : tail.size(2)] = tail * (1 - fade) + o[:, :, : tail.size(2)] * fade
+            tail = o[:, :, (end - start) * hop :]
+            yield o[:, :, : (end - start) * hop]
+
     def remove_weight_norm(self):
         print("Removing weight norm...")
         for layer in self.ups:
@@ -783,8 +874,11 @@ class SynthesizerTrn(nn.Module):
         num_languages=None,
         num_tones=None,
         norm_refenc=False,
+        inference_only=False,
         **kwargs
     ):
+        """inference_only leaves out the posterior encoder enc_q, which only
+        forward (training) and voice_conversion use."""
         super().__init__()
         self.n_vocab = n_vocab
         self.spec_channels = spec_channels
@@ -840,15 +934,19 @@ class SynthesizerTrn(nn.Module):
             upsample_kernel_sizes,
             gin_channels=gin_channels,
         )
-        self.enc_q = PosteriorEncoder(
-            spec_channels,
-            inter_channels,
-            hidden_channels,
-            5,
-            1,
-            16,
-            gin_channels=gin_channels,
-        )
+        self.inference_only = inference_only
+        if inference_only:
+            self.enc_q = None
+        else:
+            self.enc_q = PosteriorEncoder(
+                spec_channels,
+                inter_channels,
+                hidden_channels,
+                5,
+                1,
+                16,
+                gin_channels=gin_channels,
+            )
         if use_transformer_flow:
             self.flow = TransformerCouplingBlock(
                 inter_channels,
@@ -963,7 +1061,29 @@ class SynthesizerTrn(nn.Module):
             (x, logw, logw_),
         )
 
-    def infer(
+    def optimize_for_inference(self):
+        """Prepares the model for inference only, it cannot be trained afterwards.
+
+        Weight and spectral norm are folded into the plain conv weights, so the
+        normalized kernels are not recomputed on every forward. The text
+        encoder embeddings are folded (TextEncoder.fold_embeddings), and the
+        parameters are frozen. Calling it again does nothing.
+        """
+        if getattr(self, "_optimized", False):
+            return self
+        for module in self.modules():
+            for remove in (remove_weight_norm, remove_spectral_norm):
+                try:
+                    remove(module)
+                except ValueError:
+                    pass
+        self.enc_p.fold_embeddings()
+        self.eval()
+        self.requires_grad_(False)
+        self._optimized = True
+        return self
+
+    def infer_latent(
         self,
         x,
         x_lengths,
@@ -975,11 +1095,17 @@ class SynthesizerTrn(nn.Module):
         noise_scale=0.667,
         length_scale=1,
         noise_scale_w=0.8,
-        max_len=None,
         sdp_ratio=0,
         y=None,
         g=None,
+        return_attn=False,
     ):
+        """The flow output z for the text, before decoding.
+
+        The priors are expanded to the frames by indexing. The dense
+        [b, 1, t_y, t_x] alignment path is only built with return_attn,
+        otherwise attn is None.
+        """
         # x, m_p, logs_p, x_mask = self.enc_p(x, x_lengths, tone, language, bert)
         # g = self.gst(y)
         if g is None:
@@ -994,32 +1120,106 @@ class SynthesizerTrn(nn.Module):
         x, m_p, logs_p, x_mask = self.enc_p(
             x, x_lengths, tone, language, bert, ja_bert, g=g_p
         )
-        logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w) * (
-            sdp_ratio
-        ) + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
+        # a predictor with zero weight is not run
+        if sdp_ratio == 0:
+            logw = self.dp(x, x_mask, g=g)
+        elif sdp_ratio == 1:
+            logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w)
+        else:
+            logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w) * (
+                sdp_ratio
+            ) + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
         w = torch.exp(logw) * x_mask * length_scale
-        
+
         w_ceil = torch.ceil(w)
         y_lengths = torch.clamp_min(torch.sum(w_ceil, [1, 2]), 1).long()
         y_mask = torch.unsqueeze(commons.sequence_mask(y_lengths, None), 1).to(
             x_mask.dtype
         )
-        attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
-        attn = commons.generate_path(w_ceil, attn_mask)
+        attn = None
+        if return_attn:
+            attn_mask = torch.unsqueeze(x_mask, 2) * torch.unsqueeze(y_mask, -1)
+            attn = commons.generate_path(w_ceil, attn_mask)
 
-        m_p = torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(
-            1, 2
-        )  # [b, t', t], [b, t, d] -> [b, d, t']
-        logs_p = torch.matmul(attn.squeeze(1), logs_p.transpose(1, 2)).transpose(
-            1, 2
-        )  # [b, t', t], [b, t, d] -> [b, d, t']
+        # each frame takes the prior of the one phone it is aligned to
+        index, valid = commons.duration_to_index(w_ceil, y_mask.size(-1))
+        m_p = commons.expand_by_index(m_p, index, valid)  # [b, d, t] -> [b, d, t']
+        logs_p = commons.expand_by_index(logs_p, index, valid)  # [b, d, t] -> [b, d, t']
 
         z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
         z = self.flow(z_p, y_mask, g=g, reverse=True)
-        o = self.dec((z * y_mask)[:, :, :max_len], g=g)
+        return z, attn, y_mask, g, (z_p, m_p, logs_p)
+
+    def infer(
+        self,
+        x,
+        x_lengths,
+        sid,
+        tone,
+        language,
+        bert,
+        ja_bert,
+        noise_scale=0.667,
+        length_scale=1,
+        noise_scale_w=0.8,
+        max_len=None,
+        sdp_ratio=0,
+        y=None,
+        g=None,
+        dec_chunk_size=None,
+        return_attn=False,
+    ):
+        """See infer_latent for the arguments.
+
+        dec_chunk_size decodes z in windows of that many frames, which bounds
+        the decoder memory on long sentences.
+        """
+        z, attn, y_mask, g, (z_p, m_p, logs_p) = self.infer_latent(
+            x, x_lengths, sid, tone, language, bert, ja_bert,
+            noise_scale=noise_scale, length_scale=length_scale, noise_scale_w=noise_scale_w,
+            sdp_ratio=sdp_ratio, y=y, g=g, return_attn=return_attn,
+        )
+        # padded batches need the mask so shorter entries are not affected by the padding
+        dec_mask = y_mask[:, :, :max_len] if z.size(0) > 1 else None
+        if dec_chunk_size is None:
+            o = self.dec((z * y_mask)[:, :, :max_len], g=g, x_mask=dec_mask)
+        else:
+            o = torch.cat(list(self.dec.forward_chunked(
+                (z * y_mask)[:, :, :max_len], g=g, x_mask=dec_mask, chunk_size=dec_chunk_size
+            )), -1)
         # print('max/min of o:', o.max(), o.min())
         return o, attn, y_mask, (z, z_p, m_p, logs_p)
 
+    def infer_iter(
+        self,
+        x,
+        x_lengths,
+        sid,
+        tone,
+        language,
+        bert,
+        ja_bert,
+        noise_scale=0.667,
+        length_scale=1,
+        noise_scale_w=0.8,
+        max_len=None,
+        sdp_ratio=0,
+        y=None,
+        g=None,
+        chunk_size=32,
+        overlap=2,
+    ):
+        """Same as infer, but yields the audio window by window while decoding."""
+        z, attn, y_mask, g, _ = self.infer_latent(
+            x, x_lengths, sid, tone, language, bert, ja_bert,
+            noise_scale=noise_scale, length_scale=length_scale, noise_scale_w=noise_scale_w,
+            sdp_ratio=sdp_ratio, y=y, g=g,
+        )
+        dec_mask = y_mask[:, :, :max_len] if z.size(0) > 1 else None
+        yield from self.dec.forward_chunked(
+            (z * y_mask)[:, :, :max_len], g=g, x_mask=dec_mask, chunk_size=chunk_size, overlap=overlap
+        )
+
     def voice_conversion(self, y, y_lengths, sid_src, sid_tgt, tau=1.0):        
         g_src = sid_src
         g_tgt = sid_tgt
@@ -0,0 +1,97 @@
+"""Runs the text frontend of the upcoming sentences on a worker thread while
+the acoustic model synthesizes the current one.
+
+The stages hand sentences over through a bounded queue, so the frontend runs
+at most `maxsize` sentences ahead. PipelineStats records how long each stage
+was busy, to see which one bounds the throughput.
+"""
+import queue
+import threading
+import time
+from collections import defaultdict
+
+
+class PipelineStats:
+    """Busy time and number of items per pipeline stage."""
+
+    def __init__(self):
+        self.busy = defaultdict(float)
+        self.items = defaultdict(int)
+        self.start = time.perf_counter()
+        self.end = None
+
+    @property
+    def wall(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def utilization(self):
+        """The fraction of the wall time each stage was busy."""
+        wall = self.wall
+        return {stage: busy / wall for stage, busy in self.busy.items()}
+
+    def __str__(self):
+        wall = self.wall
+        stages = ', '.join(
+            f'{stage} {busy:.2f} s for {self.items[stage]} items ({busy / wall:.0%})'
+            for stage, busy in self.busy.items()
+        )
+        return f'{wall:.2f} s: {stages}'
+
+
+def timed(iterable, stats, stage):
+    """Yields from iterable, adding the time spent producing each item to stats."""
+    it = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        finally:
+            stats.busy[stage] += time.perf_counter() - start
+        stats.items[stage] += 1
+        yield item
+
+
+_DONE = object()
+
+
+def prefetch(iterable, maxsize=2):
+    """Yields from iterable, which runs on a worker thread up to maxsize items ahead.
+
+    An exception raised by iterable is raised again here. Closing the
+    generator stops the worker at its next item.
+    """
+    items = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def work():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_DONE, e))
+
+    worker = threading.Thread(target=work, name='melo-frontend', daemon=True)
+    worker.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()
@@ -7,45 +7,132 @@ import torchaudio
 import re
 
 def split_sentence(text, min_len=10, language_str='EN'):
+    splitter = sentence_splitter(min_len=min_len, language_str=language_str)
+    return splitter.feed(text) + splitter.close()
+
+
+def sentence_splitter(min_len=10, language_str='EN'):
+    """An incremental split_sentence, see LatinSentenceSplitter."""
     if language_str in ['EN', 'FR', 'ES', 'SP']:
-        sentences = split_sentences_latin(text, min_len=min_len)
-    else:
-        sentences = split_sentences_zh(text, min_len=min_len)
-    return sentences
+        return LatinSentenceSplitter(min_len=min_len)
+    return ZhSentenceSplitter(min_len=min_len)
+
+
+def split_sentence_stream(fragments, min_len=10, language_str='EN'):
+    """Yields the sentences of a text that arrives in fragments, each as soon as it is complete."""
+    splitter = sentence_splitter(min_len=min_len, language_str=language_str)
+    for fragment in fragments:
+        yield from splitter.feed(fragment)
+    yield from splitter.close()
 
 
 def split_sentences_latin(text, min_len=10):
-    text = re.sub('[。！？；]', '.', text)
-    text = re.sub('[，]', ',', text)
-    text = re.sub('[“”]', '"', text)
-    text = re.sub('[‘’]', "'", text)
-    text = re.sub(r"[\<\>\(\)\[\]\"\«\»]+", "", text)
-    return [item.strip() for item in txtsplit(text, 256, 512) if item.strip()]
+    splitter = LatinSentenceSplitter(min_len=min_len)
+    return splitter.feed(text) + splitter.close()
 
 
 def split_sentences_zh(text, min_len=10):
-    text = re.sub('[。！？；]', '.', text)
-    text = re.sub('[，]', ',', text)
-    # 将文本中的换行符、空格和制表符替换为空格
-    text = re.sub('[\n\t ]+', ' ', text)
-    # 在标点符号后添加一个空格
-    text = re.sub('([,.!?;])', r'\1 $#!', text)
-    # 分隔句子并去除前后空格
-    # sentences = [s.strip() for s in re.split('(。|！|？|；)', text)]
-    sentences = [s.strip() for s in text.split('$#!')]
-    if len(sentences[-1]) == 0: del sentences[-1]
-
-    new_sentences = []
-    new_sent = []
-    count_len = 0
-    for ind, sent in enumerate(sentences):
-        new_sent.append(sent)
-        count_len += len(sent)
-        if count_len > min_len or ind == len(sentences) - 1:
-            count_len = 0
-            new_sentences.append(' '.join(new_sent))
-            new_sent = []
-    return merge_short_sentences_zh(new_sentences)
+    splitter = ZhSentenceSplitter(min_len=min_len)
+    return splitter.feed(text) + splitter.close()
+
+
+class LatinSentenceSplitter:
+    """split_sentences_latin over a text that arrives in fragments.
+
+    feed() returns the sentences that are complete so far and close() the
+    rest. Together they are what split_sentences_latin returns for the
+    whole text.
+    """
+
+    table = str.maketrans({
+        **dict.fromkeys('。！？；', '.'), '，': ',', **dict.fromkeys('‘’', "'"),
+        **dict.fromkeys('<>()[]"«»“”', None),
+    })
+
+    def __init__(self, min_len=10):
+        self.txtsplitter = TxtSplitter(256, 512)
+
+    def feed(self, text):
+        return self.txtsplitter.feed(text.translate(self.table))
+
+    def close(self):
+        return self.txtsplitter.close()
+
+
+_ZH_PIECE_RX = re.compile(r'[^,.!?;]*[,.!?;]')
+
+
+class ZhSentenceSplitter:
+    """split_sentences_zh over a text that arrives in fragments, see LatinSentenceSplitter.
+
+    The text is cut after each punctuation mark, and the pieces are joined
+    until they are longer than min_len. A sentence of at most 2 characters
+    is merged with the next one, so the last sentence is held back until
+    the one after it is known.
+    """
+
+    table = str.maketrans({**dict.fromkeys('。！？；', '.'), '，': ','})
+
+    def __init__(self, min_len=10):
+        self.min_len = min_len
+        # the text after the last punctuation mark
+        self._tail = []
+        self._new_sent = []
+        self._count_len = 0
+        self._sens_out = []
+
+    def feed(self, text):
+        text = text.translate(self.table)
+        # the pieces up to the last punctuation mark are complete
+        end = max(map(text.rfind, ',.!?;')) + 1
+        if end == 0:
+            self._tail.append(text)
+            return []
+        text, self._tail = "".join(self._tail) + text, [text[end:]]
+        for piece in _ZH_PIECE_RX.findall(text, 0, len(text) - len(self._tail[0])):
+            self._add_piece(piece)
+        return self._pop_sentences()
+
+    def close(self):
+        self._add_piece("".join(self._tail))
+        self._tail = []
+        if self._new_sent:
+            self._add_sentence(' '.join(self._new_sent))
+            self._new_sent = []
+        # the last sentence is merged with the previous one if it is too short
+        if len(self._sens_out) > 1 and len(self._sens_out[-1]) <= 2:
+            last = self._sens_out.pop(-1)
+            self._sens_out[-1] = self._sens_out[-1] + " " + last
+        sens_out, self._sens_out = self._sens_out, []
+        return sens_out
+
+    def _add_piece(self, piece):
+        # 将文本中的换行符、空格和制表符替换为空格
+        piece = re.sub('[\n\t ]+', ' ', piece).strip()
+        if len(piece) == 0:
+            return
+        self._new_sent.append(piece)
+        self._count_len += len(piece)
+        if self._count_len > self.min_len:
+            self._count_len = 0
+            self._add_sentence(' '.join(self._new_sent))
+            self._new_sent = []
+
+    def _add_sentence(self, sentence):
+        # the merge of merge_short_sentences_zh
+        if len(self._sens_out) > 0 and len(self._sens_out[-1]) <= 2:
+            self._sens_out[-1] = self._sens_out[-1] + " " + sentence
+        else:
+            self._sens_out.append(sentence)
+
+    def _pop_sentences(self):
+        """The sentences no later sentence can be merged into."""
+        n = len(self._sens_out) - 1
+        if n > 0 and len(self._sens_out[-1]) <= 2:
+            n -= 1
+        ready = self._sens_out[:max(n, 0)]
+        del self._sens_out[:max(n, 0)]
+        return ready
 
 
 def merge_short_sentences_en(sens):
@@ -104,62 +191,126 @@ def merge_short_sentences_zh(sens):
 
 def txtsplit(text, desired_length=100, max_length=200):
     """Split text it into chunks of a desired length trying to keep sentences intact."""
-    text = re.sub(r'\n\n+', '\n', text)
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[""]', '"', text)
-    text = re.sub(r'([,.?!])', r'\1 ', text)
-    text = re.sub(r'\s+', ' ', text)
-    
-    rv = []
-    in_quote = False
-    current = ""
-    split_pos = []
-    pos = -1
-    end_pos = len(text) - 1
-    def seek(delta):
-        nonlocal pos, in_quote, current
-        is_neg = delta < 0
-        for _ in range(abs(delta)):
-            if is_neg:
-                pos -= 1
-                current = current[:-1]
-            else:
-                pos += 1
-                current += text[pos]
-            if text[pos] == '"':
-                in_quote = not in_quote
-        return text[pos]
-    def peek(delta):
-        p = pos + delta
-        return text[p] if p < end_pos and p >= 0 else ""
-    def commit():
-        nonlocal rv, current, split_pos
-        rv.append(current)
-        current = ""
-        split_pos = []
-    while pos < end_pos:
-        c = seek(1)
-        if len(current) >= max_length:
-            if len(split_pos) > 0 and len(current) > (desired_length / 2):
-                d = pos - split_pos[-1]
-                seek(-d)
-            else:
-                while c not in '!?.\n ' and pos > 0 and len(current) > desired_length:
-                    c = seek(-1)
-            commit()
-        elif not in_quote and (c in '!?\n' or (c in '.,' and peek(1) in '\n ')):
-            while pos < len(text) - 1 and len(current) < max_length and peek(1) in '!?.':
-                c = seek(1)
-            split_pos.append(pos)
-            if len(current) >= desired_length:
+    splitter = TxtSplitter(desired_length, max_length)
+    return splitter.feed(text) + splitter.close()
+
+
+class TxtSplitter:
+    """txtsplit over a text that arrives in fragments.
+
+    feed() returns the chunks that are complete so far and close() the rest.
+    The text is scanned once, positions index into it instead of building
+    the current chunk character by character.
+    """
+
+    def __init__(self, desired_length=100, max_length=200):
+        self.desired_length = desired_length
+        self.max_length = max_length
+        # the normalized text from the start of the current chunk on
+        self._text = ""
+        # the next character is preceded by a space
+        self._space = False
+        self._closed = False
+        self._in_quote = False
+        self._start = 0
+        self._pos = -1
+        self._split_pos = []
+        # the number of characters dropped from the start of self._text
+        self._offset = 0
+
+    def feed(self, text):
+        # collapse whitespace and add a space after punctuation; a trailing
+        # space is kept back until the next fragment shows it is not part of
+        # a longer run
+        text = re.sub(r'([,.?!])', r'\1 ', text)
+        text = re.sub(r'\s+', ' ', text)
+        if self._space and text and not text.startswith(' '):
+            text = ' ' + text
+        if text:
+            self._space = text.endswith(' ')
+            if self._space:
+                text = text[:-1]
+        self._text += text
+        return self._scan()
+
+    def close(self):
+        if self._space:
+            self._text += ' '
+            self._space = False
+        self._closed = True
+        rv = self._scan()
+        rv += _filter_chunks([self._text[self._start:]])
+        self._text = ""
+        return rv
+
+    def _scan(self):
+        text = self._text
+        end_pos = len(text) - 1
+        # before close(), stop where peek() could look past the text fed so far
+        last_pos = end_pos if self._closed else end_pos - 3
+        desired_length, max_length = self.desired_length, self.max_length
+        rv = []
+        in_quote, start, pos, split_pos = self._in_quote, self._start, self._pos, self._split_pos
+
+        def seek(delta):
+            nonlocal pos, in_quote
+            step = -1 if delta < 0 else 1
+            for _ in range(abs(delta)):
+                pos += step
+                if text[pos] == '"':
+                    in_quote = not in_quote
+            return text[pos]
+
+        def peek(delta):
+            p = pos + delta
+            return text[p] if p < end_pos and p >= 0 else ""
+
+        def commit():
+            nonlocal start, split_pos
+            rv.append(text[start: pos + 1])
+            start = pos + 1
+            split_pos = []
+
+        while pos < last_pos:
+            if not in_quote:
+                # skip to the next character a chunk can end at, or to max_length
+                stop = max(min(last_pos, start + max_length - 1), pos + 1)
+                m = _SPLIT_CHAR_RX.search(text, pos + 1, stop)
+                pos = (m.start() if m else stop) - 1
+            c = seek(1)
+            if pos - start + 1 >= max_length:
+                if len(split_pos) > 0 and pos - start + 1 > (desired_length / 2):
+                    seek(split_pos[-1] - pos)
+                else:
+                    while c not in '!?.\n ' and pos + self._offset > 0 and pos - start + 1 > desired_length:
+                        c = seek(-1)
                 commit()
-        elif in_quote and peek(1) == '"' and peek(2) in '\n ':
-            seek(2)
-            split_pos.append(pos)
-    rv.append(current)
-    rv = [s.strip() for s in rv]
-    rv = [s for s in rv if len(s) > 0 and not re.match(r'^[\s\.,;:!?]*$', s)]
-    return rv
+            elif not in_quote and (c in '!?\n' or (c in '.,' and peek(1) in '\n ')):
+                while pos < end_pos and pos - start + 1 < max_length and peek(1) in '!?.':
+                    c = seek(1)
+                split_pos.append(pos)
+                if pos - start + 1 >= desired_length:
+                    commit()
+            elif in_quote and peek(1) == '"' and peek(2) in '\n ':
+                seek(2)
+                split_pos.append(pos)
+
+        # drop the committed text
+        self._text = text[start:]
+        self._offset += start
+        self._in_quote = in_quote
+        self._start = 0
+        self._pos = pos - start
+        self._split_pos = [p - start for p in split_pos]
+        return _filter_chunks(rv)
+
+
+_SPLIT_CHAR_RX = re.compile('[!?\n.,"]')
+
+
+def _filter_chunks(chunks):
+    chunks = [s.strip() for s in chunks]
+    return [s for s in chunks if len(s) > 0 and not re.match(r'^[\s\.,;:!?]*$', s)]
 
 
 if __name__ == '__main__':
@@ -1,3 +1,5 @@
+import importlib
+
 from .symbols import *
 
 
@@ -20,16 +22,20 @@ def cleaned_text_to_sequence(cleaned_text, tones, language, symbol_to_id=None):
     return phones, tones, lang_ids
 
 
+lang_bert_module_names = {"ZH": "chinese_bert", "EN": "english_bert", "JP": "japanese_bert", 'ZH_MIX_EN': "chinese_mix",
+                          'FR': "french_bert", 'SP': "spanish_bert", 'ES': "spanish_bert", "KR": "korean"}
+
+
 def get_bert(norm_text, word2ph, language, device):
-    from .chinese_bert import get_bert_feature as zh_bert
-    from .english_bert import get_bert_feature as en_bert
-    from .japanese_bert import get_bert_feature as jp_bert
-    from .chinese_mix import get_bert_feature as zh_mix_en_bert
-    from .spanish_bert import get_bert_feature as sp_bert
-    from .french_bert import get_bert_feature as fr_bert
-    from .korean import get_bert_feature as kr_bert
-
-    lang_bert_func_map = {"ZH": zh_bert, "EN": en_bert, "JP": jp_bert, 'ZH_MIX_EN': zh_mix_en_bert, 
-                          'FR': fr_bert, 'SP': sp_bert, 'ES': sp_bert, "KR": kr_bert}
-    bert = lang_bert_func_map[language](norm_text, word2ph, device)
-    return bert
+    return get_bert_batch([norm_text], [word2ph], language, device)[0]
+
+
+def get_bert_batch(norm_texts, word2phs, language, device, tokenized=None):
+    """Computes the phone-level BERT features of several texts with one forward pass.
+
+    tokenized are the TokenizedText returned by clean_text_tokenized, if any.
+    """
+    # imported on first use, like the frontends in cleaner.py
+    module = importlib.import_module("." + lang_bert_module_names[language], __name__)
+    berts = module.get_bert_feature_batch(norm_texts, word2phs, device, tokenized=tokenized)
+    return berts
@@ -0,0 +1,101 @@
+import torch
+from transformers import AutoConfig, AutoModel, AutoTokenizer
+from transformers.utils import logging
+
+# the *_bert modules use hidden_states[-3] of the masked LM as the phone feature
+FEATURE_LAYER = -3
+
+_tokenizers = {}
+
+
+def get_tokenizer(model_id):
+    """Returns the process-wide tokenizer instance of model_id."""
+    if model_id not in _tokenizers:
+        _tokenizers[model_id] = AutoTokenizer.from_pretrained(model_id)
+    return _tokenizers[model_id]
+
+
+class TokenizedText:
+    """A text tokenized once, shared by g2p and the BERT feature extraction.
+
+    input_ids include the special tokens. tokens (what tokenizer.tokenize
+    returns) and offsets (character spans, fast tokenizers only) do not.
+    Iterating over it yields the tokens, so g2p can take it in place of the
+    tokenizer.tokenize output.
+    """
+
+    def __init__(self, text, model_id):
+        tokenizer = get_tokenizer(model_id)
+        encoding = tokenizer(text, return_offsets_mapping=tokenizer.is_fast)
+        self.text = text
+        self.model_id = model_id
+        self.input_ids = encoding["input_ids"]
+        self.tokens = tokenizer.convert_ids_to_tokens(self.input_ids[1:-1])
+        self.offsets = encoding["offset_mapping"][1:-1] if tokenizer.is_fast else None
+
+    def __iter__(self):
+        return iter(self.tokens)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def tokens_between(self, start, end):
+        """Tokens whose characters lie in text[start:end]."""
+        return [
+            token
+            for token, (token_start, token_end) in zip(self.tokens, self.offsets)
+            if token_start >= start and token_end <= end
+        ]
+
+
+def load_bert_encoder(model_id, device=None, feature_layer=FEATURE_LAYER):
+    """Loads the base BERT encoder truncated to the layer the features come from.
+
+    The MLM head, the pooler and the transformer layers above `feature_layer`
+    are never built, so their weights are not loaded either. The returned
+    model's last_hidden_state equals hidden_states[feature_layer] of
+    AutoModelForMaskedLM.
+    """
+    config = AutoConfig.from_pretrained(model_id)
+    config.num_hidden_layers = config.num_hidden_layers + 1 + feature_layer
+    verbosity = logging.get_verbosity()
+    # the checkpoint has weights for the dropped layers and MLM head, do not warn about them
+    logging.set_verbosity_error()
+    try:
+        model = AutoModel.from_pretrained(model_id, config=config, add_pooling_layer=False)
+    finally:
+        logging.set_verbosity(verbosity)
+    return model.to(device).eval()
+
+
+def expand_to_phones(features, word2ph):
+    """Repeats the feature of token i word2ph[i] times.
+
+    features: [n_tokens, d] -> [d, sum(word2ph)]
+    """
+    repeats = torch.as_tensor(word2ph, dtype=torch.long, device=features.device)
+    return torch.repeat_interleave(features[: len(repeats)], repeats, dim=0).T
+
+
+def get_phone_level_features(model, tokenizer, texts, word2phs, device, strict=True, tokenized=None):
+    """Runs the encoder once over a padded batch of texts.
+
+    Returns one [d, sum(word2ph)] feature per text. With `strict`, every
+    word2ph must have one entry per token of its text. `tokenized` are the
+    TokenizedText of the texts, if g2p already tokenized them.
+    """
+    with torch.no_grad():
+        if tokenized is None:
+            inputs = tokenizer(texts, return_tensors="pt", padding=True)
+        else:
+            inputs = tokenizer.pad({"input_ids": [t.input_ids for t in tokenized]}, return_tensors="pt")
+        for i in inputs:
+            inputs[i] = inputs[i].to(device)
+        res = model(**inputs).last_hidden_state.cpu()
+    lengths = inputs["attention_mask"].sum(1).tolist()
+    features = []
+    for i, word2ph in enumerate(word2phs):
+        if strict:
+            assert lengths[i] == len(word2ph), f"{lengths[i]}/{len(word2ph)}"
+        features.append(expand_to_phones(res[i, : lengths[i]], word2ph))
+    return features
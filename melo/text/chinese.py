@@ -1,11 +1,14 @@
+import marshal
 import os
 import re
+import tempfile
+from functools import lru_cache
 
 import cn2an
 from pypinyin import lazy_pinyin, Style
 
 from .symbols import punctuation
-from .tone_sandhi import ToneSandhi
+from .tone_sandhi import ToneSandhi, word_finals
 
 current_file_path = os.path.dirname(__file__)
 pinyin_to_symbol_map = {
@@ -13,8 +16,87 @@ pinyin_to_symbol_map = {
     for line in open(os.path.join(current_file_path, "opencpop-strict.txt")).readlines()
 }
 
+import jieba
 import jieba.posseg as psg
 
+def jieba_cache_path():
+    """Where warmup_jieba keeps the default dictionary: in melo's directory of the
+    user cache dir, named after the jieba version and the mtime of the
+    dictionary, so a changed jieba or dictionary is not loaded from a stale cache."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    dict_path = os.path.join(os.path.dirname(jieba.__file__), jieba.DEFAULT_DICT_NAME)
+    mtime = int(os.path.getmtime(dict_path)) if os.path.exists(dict_path) else 0
+    return os.path.join(cache_home, "melo", f"jieba_{jieba.__version__}_{mtime}.cache")
+
+
+def _is_private(st):
+    # owned by this user and not writable by anyone else
+    return (not hasattr(os, "getuid") or st.st_uid == os.getuid()) and not st.st_mode & 0o022
+
+
+def _load_jieba_cache(cache_path, tokenizer):
+    try:
+        if not _is_private(os.stat(os.path.dirname(cache_path))):
+            return False
+        with open(cache_path, "rb") as f:
+            if not _is_private(os.fstat(f.fileno())):
+                return False
+            freq, total = marshal.load(f)
+        if not isinstance(freq, dict) or not isinstance(total, int):
+            return False
+    except Exception:
+        # missing, truncated or written by something else, rebuilt from the dictionary
+        return False
+    tokenizer.FREQ, tokenizer.total = freq, total
+    tokenizer.initialized = True
+    return True
+
+
+def _save_jieba_cache(cache_path, tokenizer):
+    directory = os.path.dirname(cache_path)
+    tmp_path = None
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if not _is_private(os.stat(directory)):
+            return
+        # mkstemp creates the file readable and writable by this user only
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            marshal.dump((tokenizer.FREQ, tokenizer.total), f)
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+    except OSError:
+        # not writable, jieba's own cache still works
+        pass
+    finally:
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+
+def warmup_jieba(cache_path=None, tokenizer=None):
+    """Loads jieba's default prefix dictionary and runs one POS cut.
+
+    The dictionary is kept at cache_path (jieba_cache_path by default) in
+    jieba's own marshal format, and is only read when the file and its
+    directory belong to this user and nobody else can write them. It is
+    built there on first use, and rebuilt when it cannot be loaded.
+    """
+    tokenizer = tokenizer or jieba.dt
+    cache_path = cache_path or jieba_cache_path()
+    with tokenizer.lock:
+        if not tokenizer.initialized and tokenizer.dictionary is None:
+            if not _load_jieba_cache(cache_path, tokenizer):
+                tokenizer.initialize()
+                _save_jieba_cache(cache_path, tokenizer)
+    if tokenizer is jieba.dt:
+        psg.lcut("预热")
+
+
+warmup_jieba()
+
 
 rep_map = {
     "：": ",",
@@ -81,15 +163,35 @@ def _get_initials_finals(word):
     initials = []
     finals = []
     orig_initials = lazy_pinyin(word, neutral_tone_with_five=True, style=Style.INITIALS)
-    orig_finals = lazy_pinyin(
-        word, neutral_tone_with_five=True, style=Style.FINALS_TONE3
-    )
+    orig_finals = word_finals(word)
     for c, v in zip(orig_initials, orig_finals):
         initials.append(c)
         finals.append(v)
     return initials, finals
 
 
+@lru_cache(maxsize=65536)
+def get_initials_finals_sandhi(word, pos):
+    """Initials and tone sandhi modified finals of a word cut by jieba.
+
+    Both only depend on (word, pos), a small vocabulary covers most text, so
+    they are cached. The returned tuples are shared, do not modify them.
+    """
+    initials, finals = _get_initials_finals(word)
+    finals = tone_modifier.modified_tone(word, pos, finals)
+    return tuple(initials), tuple(finals)
+
+
+@lru_cache(maxsize=4096)
+def cut_for_sandhi(seg):
+    """jieba POS cut of a sentence segment, merged for tone sandhi.
+
+    Cached per segment, prompts repeat a lot. Returns (word, pos) tuples.
+    """
+    seg_cut = tone_modifier.pre_merge_for_modify(psg.lcut(seg))
+    return tuple((word, pos) for word, pos in seg_cut)
+
+
 def _g2p(segments):
     phones_list = []
     tones_list = []
@@ -97,18 +199,16 @@ def _g2p(segments):
     for seg in segments:
         # Replace all English words in the sentence
         seg = re.sub("[a-zA-Z]+", "", seg)
-        seg_cut = psg.lcut(seg)
+        seg_cut = cut_for_sandhi(seg)
         initials = []
         finals = []
-        seg_cut = tone_modifier.pre_merge_for_modify(seg_cut)
         for word, pos in seg_cut:
             if pos == "eng":
                 import pdb; pdb.set_trace()
                 continue
-            sub_initials, sub_finals = _get_initials_finals(word)
-            sub_finals = tone_modifier.modified_tone(word, pos, sub_finals)
-            initials.append(sub_initials)
-            finals.append(sub_finals)
+            sub_initials, sub_finals = get_initials_finals_sandhi(word, pos)
+            initials.append(list(sub_initials))
+            finals.append(list(sub_finals))
 
             # assert len(sub_initials) == len(sub_finals) == len(word)
         initials = sum(initials, [])
@@ -176,10 +276,10 @@ def text_normalize(text):
     return text
 
 
-def get_bert_feature(text, word2ph, device=None):
+def get_bert_feature(text, word2ph, device=None, tokenized=None):
     from text import chinese_bert
 
-    return chinese_bert.get_bert_feature(text, word2ph, device=device)
+    return chinese_bert.get_bert_feature(text, word2ph, device=device, tokenized=tokenized)
 
 
 if __name__ == "__main__":
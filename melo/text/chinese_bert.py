@@ -1,23 +1,24 @@
 import torch
 import sys
-from transformers import AutoTokenizer, AutoModelForMaskedLM
+
+from .bert_utils import load_bert_encoder, get_phone_level_features, get_tokenizer
 
 
 # model_id = 'hfl/chinese-roberta-wwm-ext-large'
 local_path = "./bert/chinese-roberta-wwm-ext-large"
 
 
-tokenizers = {}
 models = {}
 
-def get_bert_feature(text, word2ph, device=None, model_id='hfl/chinese-roberta-wwm-ext-large'):
+def get_bert_feature(text, word2ph, device=None, model_id='hfl/chinese-roberta-wwm-ext-large', tokenized=None):
+    return get_bert_feature_batch([text], [word2ph], device=device, model_id=model_id, tokenized=None if tokenized is None else [tokenized])[0]
+
+
+def get_bert_feature_batch(texts, word2phs, device=None, model_id='hfl/chinese-roberta-wwm-ext-large', tokenized=None):
     if model_id not in models:
-        models[model_id] = AutoModelForMaskedLM.from_pretrained(
-            model_id
-        ).to(device)
-        tokenizers[model_id] = AutoTokenizer.from_pretrained(model_id)
+        models[model_id] = load_bert_encoder(model_id, device)
     model = models[model_id]
-    tokenizer = tokenizers[model_id]
+    tokenizer = get_tokenizer(model_id)
 
     if (
         sys.platform == "darwin"
@@ -28,22 +29,8 @@ def get_bert_feature(text, word2ph, device=None, model_id='hfl/chinese-roberta-w
     if not device:
         device = "cuda"
 
-    with torch.no_grad():
-        inputs = tokenizer(text, return_tensors="pt")
-        for i in inputs:
-            inputs[i] = inputs[i].to(device)
-        res = model(**inputs, output_hidden_states=True)
-        res = torch.cat(res["hidden_states"][-3:-2], -1)[0].cpu()
-    # import pdb; pdb.set_trace()
     # assert len(word2ph) == len(text) + 2
-    word2phone = word2ph
-    phone_level_feature = []
-    for i in range(len(word2phone)):
-        repeat_feature = res[i].repeat(word2phone[i], 1)
-        phone_level_feature.append(repeat_feature)
-
-    phone_level_feature = torch.cat(phone_level_feature, dim=0)
-    return phone_level_feature.T
+    return get_phone_level_features(model, tokenizer, texts, word2phs, device, strict=False, tokenized=tokenized)
 
 
 if __name__ == "__main__":
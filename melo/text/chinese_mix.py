@@ -7,8 +7,9 @@ from pypinyin import lazy_pinyin, Style
 # from text.symbols import punctuation
 from .symbols import language_tone_start_map
 from .tone_sandhi import ToneSandhi
+from .chinese import get_initials_finals_sandhi, cut_for_sandhi
 from .english import g2p as g2p_en
-from transformers import AutoTokenizer
+from .bert_utils import get_tokenizer, TokenizedText
 
 punctuation = ["!", "?", "…", ",", ".", "'", "-"]
 current_file_path = os.path.dirname(__file__)
@@ -66,16 +67,15 @@ def replace_punctuation(text):
     return replaced_text
 
 
-def g2p(text, impl='v2'):
+def g2p(text, impl='v2', tokenized=None):
     pattern = r"(?<=[{0}])\s*".format("".join(punctuation))
     sentences = [i for i in re.split(pattern, text) if i.strip() != ""]
     if impl == 'v1':
-        _func = _g2p
+        phones, tones, word2ph = _g2p(sentences)
     elif impl == 'v2':
-        _func = _g2p_v2
+        phones, tones, word2ph = _g2p_v2(sentences, text, tokenized)
     else:
         raise NotImplementedError()
-    phones, tones, word2ph = _func(sentences)
     assert sum(word2ph) == len(phones)
     # assert len(word2ph) == len(text)  # Sometimes it will crash,you can add a try-catch.
     phones = ["_"] + phones + ["_"]
@@ -97,7 +97,12 @@ def _get_initials_finals(word):
     return initials, finals
 
 model_id = 'bert-base-multilingual-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = get_tokenizer(model_id)
+
+
+def tokenize(norm_text):
+    return TokenizedText(norm_text, model_id)
+
 def _g2p(segments):
     phones_list = []
     tones_list = []
@@ -105,19 +110,17 @@ def _g2p(segments):
     for seg in segments:
         # Replace all English words in the sentence
         # seg = re.sub("[a-zA-Z]+", "", seg)
-        seg_cut = psg.lcut(seg)
+        seg_cut = cut_for_sandhi(seg)
         initials = []
         finals = []
-        seg_cut = tone_modifier.pre_merge_for_modify(seg_cut)
         for word, pos in seg_cut:
             if pos == "eng":
                 initials.append(['EN_WORD'])
                 finals.append([word])
             else:
-                sub_initials, sub_finals = _get_initials_finals(word)
-                sub_finals = tone_modifier.modified_tone(word, pos, sub_finals)
-                initials.append(sub_initials)
-                finals.append(sub_finals)
+                sub_initials, sub_finals = get_initials_finals_sandhi(word, pos)
+                initials.append(list(sub_initials))
+                finals.append(list(sub_finals))
 
             # assert len(sub_initials) == len(sub_finals) == len(word)
         initials = sum(initials, [])
@@ -194,30 +197,39 @@ def text_normalize(text):
     return text
 
 
-def get_bert_feature(text, word2ph, device):
+def get_bert_feature(text, word2ph, device, tokenized=None):
     from . import chinese_bert
-    return chinese_bert.get_bert_feature(text, word2ph, model_id='bert-base-multilingual-uncased', device=device)
+    return chinese_bert.get_bert_feature(text, word2ph, model_id=model_id, device=device, tokenized=tokenized)
 
-from .chinese import _g2p as _chinese_g2p
-def _g2p_v2(segments):
-    spliter = '#$&^!@'
 
+def get_bert_feature_batch(texts, word2phs, device, tokenized=None):
+    from . import chinese_bert
+    return chinese_bert.get_bert_feature_batch(texts, word2phs, model_id=model_id, device=device, tokenized=tokenized)
+
+from .chinese import _g2p as _chinese_g2p
+def _g2p_v2(segments, full_text=None, tokenized=None):
+    """tokenized is the TokenizedText of full_text, the English fragments
+    reuse its tokens instead of being tokenized again."""
     phones_list = []
     tones_list = []
     word2ph = []
 
-    for text in segments:
-        assert spliter not in text
-        # replace all english words
-        text = re.sub('([a-zA-Z\s]+)', lambda x: f'{spliter}{x.group(1)}{spliter}', text)
-        texts = text.split(spliter)
-        texts = [t for t in texts if len(t) > 0]
-
-        
-        for text in texts:
+    cursor = 0
+    for segment in segments:
+        if tokenized is not None:
+            cursor = full_text.find(segment, cursor)
+        # split off all english words
+        start = cursor
+        for text in re.split('([a-zA-Z\s]+)', segment):
+            end = start + len(text)
+            if len(text) == 0:
+                continue
             if re.match('[a-zA-Z\s]+', text):
                 # english
-                tokenized_en = tokenizer.tokenize(text)
+                if tokenized is not None and tokenized.offsets is not None:
+                    tokenized_en = tokenized.tokens_between(start, end)
+                else:
+                    tokenized_en = tokenizer.tokenize(text)
                 phones_en, tones_en, word2ph_en = g2p_en(text=None, pad_start_end=False, tokenized=tokenized_en)
                 # apply offset to tones_en
                 tones_en = [t + language_tone_start_map['EN'] for t in tones_en]
@@ -229,6 +241,8 @@ def _g2p_v2(segments):
                 phones_list += phones_zh
                 tones_list += tones_zh
                 word2ph += word2ph_zh
+            start = end
+        cursor += len(segment)
     return phones_list, tones_list, word2ph
 
     
@@ -1,30 +1,55 @@
-from . import chinese, japanese, english, chinese_mix, korean, french, spanish
+import importlib
+
 from . import cleaned_text_to_sequence
-import copy
+from melo.commons import intersperse_word2ph
+
+# a frontend loads its tokenizer, dictionaries and g2p models when imported,
+# so it is only imported the first time its language is used
+language_module_names = {"ZH": "chinese", "JP": "japanese", "EN": "english", 'ZH_MIX_EN': "chinese_mix", 'KR': "korean",
+                    'FR': "french", 'SP': "spanish", 'ES': "spanish"}
+
+
+warmup_texts = {"ZH": "你好，世界。", "JP": "こんにちは、世界。", "EN": "Hello, world.", 'ZH_MIX_EN': "你好，world。",
+                'KR': "안녕하세요, 세계.", 'FR': "Bonjour le monde.", 'SP': "Hola, mundo.", 'ES': "Hola, mundo."}
+
+
+def get_language_module(language):
+    return importlib.import_module("." + language_module_names[language], __package__)
 
-language_module_map = {"ZH": chinese, "JP": japanese, "EN": english, 'ZH_MIX_EN': chinese_mix, 'KR': korean,
-                    'FR': french, 'SP': spanish, 'ES': spanish}
+
+def warmup(language):
+    """Loads the frontend of language and runs it once, so the first request
+    does not pay for loading tokenizers, dictionaries and segmenters."""
+    clean_text(warmup_texts[language], language)
 
 
 def clean_text(text, language):
-    language_module = language_module_map[language]
-    norm_text = language_module.text_normalize(text)
-    phones, tones, word2ph = language_module.g2p(norm_text)
+    norm_text, phones, tones, word2ph, _ = clean_text_tokenized(text, language)
     return norm_text, phones, tones, word2ph
 
 
-def clean_text_bert(text, language, device=None):
-    language_module = language_module_map[language]
+def clean_text_tokenized(text, language):
+    """clean_text that also returns the TokenizedText g2p worked on, so the
+    BERT features can reuse it. It is None for languages without a g2p
+    tokenizer."""
+    language_module = get_language_module(language)
     norm_text = language_module.text_normalize(text)
-    phones, tones, word2ph = language_module.g2p(norm_text)
+    if hasattr(language_module, "tokenize"):
+        tokenized = language_module.tokenize(norm_text)
+        phones, tones, word2ph = language_module.g2p(norm_text, tokenized=tokenized)
+    else:
+        tokenized = None
+        phones, tones, word2ph = language_module.g2p(norm_text)
+    return norm_text, phones, tones, word2ph, tokenized
+
+
+def clean_text_bert(text, language, device=None):
+    language_module = get_language_module(language)
+    norm_text, phones, tones, word2ph, tokenized = clean_text_tokenized(text, language)
     
-    word2ph_bak = copy.deepcopy(word2ph)
-    for i in range(len(word2ph)):
-        word2ph[i] = word2ph[i] * 2
-    word2ph[0] += 1
-    bert = language_module.get_bert_feature(norm_text, word2ph, device=device)
+    bert = language_module.get_bert_feature(norm_text, intersperse_word2ph(word2ph), device=device, tokenized=tokenized)
     
-    return norm_text, phones, tones, word2ph_bak, bert
+    return norm_text, phones, tones, word2ph, bert
 
 
 def text_to_sequence(text, language):
@@ -1,4 +1,3 @@
-import pickle
 import os
 import re
 from g2p_en import G2p
@@ -8,13 +7,14 @@ from . import symbols
 from .english_utils.abbreviations import expand_abbreviations
 from .english_utils.time_norm import expand_time_english
 from .english_utils.number_norm import normalize_numbers
-from .japanese import distribute_phone
+from .english_utils.cmu_lexicon import CMULexicon, write_lexicon
+from .english_utils.oov_cache import OOVCache
 
-from transformers import AutoTokenizer
+from .bert_utils import get_tokenizer, TokenizedText
 
 current_file_path = os.path.dirname(__file__)
 CMU_DICT_PATH = os.path.join(current_file_path, "cmudict.rep")
-CACHE_PATH = os.path.join(current_file_path, "cmudict_cache.pickle")
+CACHE_PATH = os.path.join(current_file_path, "cmudict_lexicon.bin")
 _g2p = G2p()
 
 arpa = {
@@ -92,6 +92,15 @@ arpa = {
 }
 
 
+def distribute_phone(n_phone, n_word):
+    phones_per_word = [0] * n_word
+    for task in range(n_phone):
+        min_tasks = min(phones_per_word)
+        min_index = phones_per_word.index(min_tasks)
+        phones_per_word[min_index] += 1
+    return phones_per_word
+
+
 def post_replace_ph(ph):
     rep_map = {
         "：": ",",
@@ -139,23 +148,24 @@ def read_dict():
     return g2p_dict
 
 
-def cache_dict(g2p_dict, file_path):
-    with open(file_path, "wb") as pickle_file:
-        pickle.dump(g2p_dict, pickle_file)
+def get_dict():
+    """The CMU dictionary, memory-mapped from a lexicon file built from
+    cmudict.rep on first use."""
+    if not os.path.exists(CACHE_PATH):
+        write_lexicon(read_dict(), CACHE_PATH)
+    return CMULexicon(CACHE_PATH)
 
 
-def get_dict():
-    if os.path.exists(CACHE_PATH):
-        with open(CACHE_PATH, "rb") as pickle_file:
-            g2p_dict = pickle.load(pickle_file)
-    else:
-        g2p_dict = read_dict()
-        cache_dict(g2p_dict, CACHE_PATH)
+eng_dict = get_dict()
 
-    return g2p_dict
 
+def _oov_g2p(word):
+    return list(filter(lambda p: p != " ", _g2p(word)))
 
-eng_dict = get_dict()
+
+# pronunciations of words missing from eng_dict, call oov_cache.set_path(path)
+# to also keep them in a file shared by all processes
+oov_cache = OOVCache(_oov_g2p)
 
 
 def refine_ph(phn):
@@ -186,7 +196,12 @@ def text_normalize(text):
     return text
 
 model_id = 'bert-base-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = get_tokenizer(model_id)
+
+
+def tokenize(norm_text):
+    return TokenizedText(norm_text, model_id)
+
 def g2p_old(text):
     tokenized = tokenizer.tokenize(text)
     # import pdb; pdb.set_trace()
@@ -239,7 +254,7 @@ def g2p(text, pad_start_end=True, tokenized=None):
             tones += tns
             phone_len += len(phns)
         else:
-            phone_list = list(filter(lambda p: p != " ", _g2p(w)))
+            phone_list = oov_cache(w)
             for ph in phone_list:
                 if ph in arpa:
                     ph, tn = refine_ph(ph)
@@ -259,10 +274,16 @@ def g2p(text, pad_start_end=True, tokenized=None):
         word2ph = [1] + word2ph + [1]
     return phones, tones, word2ph
 
-def get_bert_feature(text, word2ph, device=None):
+def prewarm_oov_cache(words):
+    """Runs g2p over words, so the ones missing from eng_dict are in oov_cache."""
+    for word in words:
+        g2p(text_normalize(word))
+
+
+def get_bert_feature(text, word2ph, device=None, tokenized=None):
     from text import english_bert
 
-    return english_bert.get_bert_feature(text, word2ph, device=device)
+    return english_bert.get_bert_feature(text, word2ph, device=device, tokenized=tokenized)
 
 if __name__ == "__main__":
     # print(get_dict())
@@ -0,0 +1,157 @@
+"""Memory-mapped CMU pronunciation lexicon.
+
+The lexicon file holds the words sorted by their utf-8 bytes, and for each
+word its syllables as phoneme ids into a small symbol table. It is opened
+with mmap, so loading it reads nothing up front and every process mapping
+the same file shares its pages.
+
+Layout, integers in native byte order, each array 4-byte aligned:
+    MAGIC, then the int32 counts n_words, n_syllables, n_phones,
+    n_key_bytes, n_symbol_bytes
+    key_offsets       int32[n_words + 1]      word i is key_bytes[key_offsets[i]:key_offsets[i + 1]]
+    word_syllables    int32[n_words + 1]      syllables of word i
+    syllable_phones   int32[n_syllables + 1]  phones of syllable j
+    phones            uint8[n_phones]         ids into the symbol table
+    key_bytes         uint8[n_key_bytes]
+    symbol_bytes      uint8[n_symbol_bytes]   the symbols joined by "\\n"
+"""
+import bisect
+import mmap
+import os
+import tempfile
+from array import array
+
+MAGIC = b"CMULEX01"
+_SECTIONS = [
+    ("key_offsets", "i", lambda n: n["n_words"] + 1),
+    ("word_syllables", "i", lambda n: n["n_words"] + 1),
+    ("syllable_phones", "i", lambda n: n["n_syllables"] + 1),
+    ("phones", "B", lambda n: n["n_phones"]),
+    ("key_bytes", "B", lambda n: n["n_key_bytes"]),
+    ("symbol_bytes", "B", lambda n: n["n_symbol_bytes"]),
+]
+_COUNT_NAMES = ["n_words", "n_syllables", "n_phones", "n_key_bytes", "n_symbol_bytes"]
+
+
+def _align(offset):
+    return (offset + 3) // 4 * 4
+
+
+def write_lexicon(g2p_dict, path):
+    """Writes {word: [[phone, ...], ...]} as a lexicon file.
+
+    The file is written next to path and moved into place, so processes
+    building it concurrently never see a partial file.
+    """
+    keys = sorted((word.encode("utf-8"), word) for word in g2p_dict)
+    symbols = sorted({phone for syllables in g2p_dict.values() for syllable in syllables for phone in syllable})
+    assert len(symbols) < 256
+    symbol_ids = {s: i for i, s in enumerate(symbols)}
+
+    arrays = {name: array(typecode) for name, typecode, _ in _SECTIONS}
+    arrays["key_offsets"].append(0)
+    arrays["word_syllables"].append(0)
+    arrays["syllable_phones"].append(0)
+    for key, word in keys:
+        arrays["key_offsets"].append(arrays["key_offsets"][-1] + len(key))
+        for syllable in g2p_dict[word]:
+            arrays["phones"].extend(symbol_ids[phone] for phone in syllable)
+            arrays["syllable_phones"].append(len(arrays["phones"]))
+        arrays["word_syllables"].append(len(arrays["syllable_phones"]) - 1)
+    arrays["key_bytes"].frombytes(b"".join(key for key, _ in keys))
+    arrays["symbol_bytes"].frombytes("\n".join(symbols).encode("utf-8"))
+    counts = array("i", [
+        len(keys), len(arrays["syllable_phones"]) - 1, len(arrays["phones"]),
+        len(arrays["key_bytes"]), len(arrays["symbol_bytes"]),
+    ])
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(counts.tobytes())
+            for name, _, _ in _SECTIONS:
+                f.write(b"\0" * (_align(f.tell()) - f.tell()))
+                f.write(arrays[name].tobytes())
+        # mkstemp creates the file 0600, the lexicon is shared by all users of the install
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class _Keys:
+    """The sorted words as a sequence of bytes, for bisect."""
+
+    def __init__(self, key_offsets, data, start):
+        self.key_offsets = key_offsets
+        self.data = data
+        self.start = start
+
+    def __len__(self):
+        return len(self.key_offsets) - 1
+
+    def __getitem__(self, i):
+        # slicing the mmap itself returns bytes, which bisect can compare
+        return self.data[self.start + self.key_offsets[i]: self.start + self.key_offsets[i + 1]]
+
+
+class CMULexicon:
+    """Read-only {word: [[phone, ...], ...]} mapping over a lexicon file.
+
+    Lookups return the same lists the dict built by english.read_dict holds.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a CMU lexicon file")
+        data = memoryview(self._mmap)
+        offset = len(MAGIC)
+        counts = dict(zip(_COUNT_NAMES, data[offset: offset + 4 * len(_COUNT_NAMES)].cast("i")))
+        offset += 4 * len(_COUNT_NAMES)
+        starts = {}
+        for name, typecode, size in _SECTIONS:
+            offset = starts[name] = _align(offset)
+            n_bytes = size(counts) * array(typecode).itemsize
+            setattr(self, name, data[offset: offset + n_bytes].cast(typecode))
+            offset += n_bytes
+        self.symbols = self.symbol_bytes.tobytes().decode("utf-8").split("\n")
+        self._keys = _Keys(self.key_offsets, self._mmap, starts["key_bytes"])
+
+    def _index(self, word):
+        key = word.encode("utf-8")
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return None
+
+    def _syllables(self, i):
+        bounds = self.syllable_phones[self.word_syllables[i]: self.word_syllables[i + 1] + 1]
+        return [[self.symbols[p] for p in self.phones[s:e]] for s, e in zip(bounds[:-1], bounds[1:])]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, word):
+        return self._index(word) is not None
+
+    def __getitem__(self, word):
+        i = self._index(word)
+        if i is None:
+            raise KeyError(word)
+        return self._syllables(i)
+
+    def get(self, word, default=None):
+        i = self._index(word)
+        return default if i is None else self._syllables(i)
+
+    def __iter__(self):
+        for i in range(len(self._keys)):
+            yield self._keys[i].decode("utf-8")
+
+    def items(self):
+        for i, word in enumerate(self):
+            yield word, self._syllables(i)
@@ -0,0 +1,103 @@
+"""Cache of g2p_en pronunciations for words missing from the CMU dictionary.
+
+Recently used words are kept in a bounded in-memory LRU. With a path, every
+result is also appended to a cache file, one "word<TAB>phone phone ..." line
+per word. Processes sharing the file pick up each other's lines on their
+next miss, so a word runs through the neural G2P model only once.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+
+class OOVCache:
+    def __init__(self, g2p_fn, maxsize=10000, path=None):
+        self.g2p_fn = g2p_fn
+        self.maxsize = maxsize
+        self.path = None
+        self._lru = OrderedDict()
+        # word -> offset of its line in the cache file
+        self._index = {}
+        self._read_offset = 0
+        self._lock = threading.Lock()
+        if path is not None:
+            self.set_path(path)
+
+    def set_path(self, path):
+        """Starts appending to (and reading from) the cache file at path."""
+        with self._lock:
+            self.path = path
+            self._index = {}
+            self._read_offset = 0
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._sync()
+
+    def __call__(self, word):
+        """The phones of word, from the cache or g2p_fn."""
+        with self._lock:
+            phones = self._get(word)
+            if phones is None and self.path is not None:
+                self._sync()
+                phones = self._get(word)
+        if phones is None:
+            phones = self.g2p_fn(word)
+            with self._lock:
+                self._put(word, phones)
+                self._append(word, phones)
+        return list(phones)
+
+    def prewarm(self, words):
+        """Runs the words missing from the cache through g2p_fn."""
+        for word in words:
+            self(word)
+
+    def _get(self, word):
+        if word in self._lru:
+            self._lru.move_to_end(word)
+            return self._lru[word]
+        if word in self._index:
+            with open(self.path, "rb") as f:
+                f.seek(self._index[word])
+                _, phones = self._parse(f.readline())
+            self._put(word, phones)
+            return phones
+        return None
+
+    def _put(self, word, phones):
+        self._lru[word] = phones
+        self._lru.move_to_end(word)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def _sync(self):
+        """Indexes the lines appended to the cache file since the last sync."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == self._read_offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._read_offset)
+            offset = self._read_offset
+            for line in f:
+                # a line another process is still writing
+                if not line.endswith(b"\n"):
+                    break
+                word, _ = self._parse(line)
+                self._index[word] = offset
+                offset += len(line)
+        self._read_offset = offset
+
+    def _append(self, word, phones):
+        if self.path is None or "\t" in word or "\n" in word:
+            return
+        line = f"{word}\t{' '.join(phones)}\n".encode("utf-8")
+        # one O_APPEND write per line, so lines of concurrent writers do not interleave
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _parse(line):
+        word, phones = line.decode("utf-8").rstrip("\n").split("\t")
+        return word, phones.split(" ") if phones else []
@@ -1,12 +1,27 @@
+from functools import lru_cache
+
 from .cleaner import spanish_cleaners
 from .gruut_wrapper import Gruut
 
+# gruut loads its lexicon and models once, the phonemizer is shared by all calls
+phonemizer = Gruut(language="es-es", keep_puncs=True, keep_stress=True, use_espeak_phonemes=True)
+
 def es2ipa(text):
-    e = Gruut(language="es-es", keep_puncs=True, keep_stress=True, use_espeak_phonemes=True)
     # text = spanish_cleaners(text)
-    phonemes = e.phonemize(text, separator="")
+    phonemes = phonemizer.phonemize(text, separator="")
     return phonemes
 
 
+@lru_cache(maxsize=65536)
+def word2ipa(word):
+    return es2ipa(word)
+
+
+def words2ipa(words):
+    """es2ipa of every word of a sentence, phonemizing the sentence with one gruut pass."""
+    ipas = phonemizer.phonemize_words(words)
+    return [word2ipa(word) if ipa is None else ipa for word, ipa in zip(words, ipas)]
+
+
 if __name__ == '__main__':
   print(es2ipa('¿Y a quién echaría de menos, en el mundo si no fuese a vos?'))
\ No newline at end of file
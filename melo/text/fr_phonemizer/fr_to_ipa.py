@@ -1,6 +1,11 @@
+from functools import lru_cache
+
 from .cleaner import french_cleaners
 from .gruut_wrapper import Gruut
 
+# gruut loads its lexicon and models once, the phonemizer is shared by all calls
+phonemizer = Gruut(language="fr-fr", keep_puncs=True, keep_stress=True, use_espeak_phonemes=True)
+
 
 def remove_consecutive_t(input_str):
     result = []
@@ -21,10 +26,20 @@ def remove_consecutive_t(input_str):
     return ''.join(result)
 
 def fr2ipa(text):
-    e = Gruut(language="fr-fr", keep_puncs=True, keep_stress=True, use_espeak_phonemes=True)
     # text = french_cleaners(text)
-    phonemes = e.phonemize(text, separator="")
+    phonemes = phonemizer.phonemize(text, separator="")
     # print(phonemes)
     phonemes = remove_consecutive_t(phonemes)
     # print(phonemes)
-    return phonemes
\ No newline at end of file
+    return phonemes
+
+
+@lru_cache(maxsize=65536)
+def word2ipa(word):
+    return fr2ipa(word)
+
+
+def words2ipa(words):
+    """fr2ipa of every word of a sentence, phonemizing the sentence with one gruut pass."""
+    ipas = phonemizer.phonemize_words(words)
+    return [word2ipa(word) if ipa is None else remove_consecutive_t(ipa) for word, ipa in zip(words, ipas)]
@@ -106,6 +106,49 @@ class Gruut(BasePhonemizer):
         ph = f"{separator} ".join(ph_words)
         return ph
 
+    def phonemize_words(self, words: List[str]) -> List[str]:
+        """Phonemizes the words of one sentence with a single gruut pass.
+
+        Returns one phoneme string per word, or None for the words gruut does not
+        return as a word of their own, like punctuation or a word gruut merged with
+        its neighbours ("l", "'", "homme" -> "l'homme"). The caller phonemizes
+        those on their own.
+        """
+        gruut_words = [
+            word
+            for sentence in gruut.sentences(" ".join(words), lang=self.language, espeak=self.use_espeak_phonemes)
+            for word in sentence
+            if not word.is_break
+        ]
+        result = [None] * len(words)
+        j = 0
+        merged = ""
+        for i, word in enumerate(words):
+            if j == len(gruut_words):
+                break
+            target = gruut_words[j].text.lower()
+            # gruut phonemizes some punctuation ("¿" -> "d"), which word by word it strips
+            if not merged and word.lower() == target and any(c.isalnum() for c in word):
+                result[i] = self._word_phonemes(gruut_words[j])
+                j += 1
+                continue
+            merged += word.lower()
+            if merged == target:
+                j += 1
+                merged = ""
+            elif not target.startswith(merged):
+                # a word gruut dropped, punctuation most of the time
+                merged = ""
+        return result
+
+    def _word_phonemes(self, word) -> str:
+        word_phonemes = []
+        for word_phoneme in word.phonemes:
+            if not self.keep_stress:
+                word_phoneme = IPA.without_stress(word_phoneme)
+            word_phonemes.extend(word_phoneme.translate(GRUUT_TRANS_TABLE))
+        return "".join(word_phonemes)
+
     def _phonemize(self, text, separator):
         return self.phonemize_gruut(text, separator, tie=False)
 
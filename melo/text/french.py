@@ -5,7 +5,7 @@ import re
 from . import symbols
 from .fr_phonemizer import cleaner as fr_cleaner
 from .fr_phonemizer import fr_to_ipa
-from transformers import AutoTokenizer
+from .bert_utils import get_tokenizer, TokenizedText
 
 
 def distribute_phone(n_phone, n_word):
@@ -21,7 +21,18 @@ def text_normalize(text):
     return text
 
 model_id = 'dbmdz/bert-base-french-europeana-cased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = get_tokenizer(model_id)
+
+
+def tokenize(norm_text):
+    return TokenizedText(norm_text, model_id)
+
+
+# Phonemize a whole sentence with one gruut pass instead of word by word. In
+# context gruut applies liaison ("les amis" -> "le-z amˈi"), which the released
+# models were not trained with, so it is off by default.
+sentence_level_g2p = False
+
 
 def g2p(text, pad_start_end=True, tokenized=None):
     if tokenized is None:
@@ -38,15 +49,19 @@ def g2p(text, pad_start_end=True, tokenized=None):
     phones = []
     tones = []
     word2ph = []
+    words = ["".join(group) for group in ph_groups]
+    if sentence_level_g2p:
+        ipas = fr_to_ipa.words2ipa(words)
+    else:
+        ipas = [fr_to_ipa.word2ipa(w) for w in words]
     # print(ph_groups)
-    for group in ph_groups:
-        w = "".join(group)
+    for group, w, ipa in zip(ph_groups, words, ipas):
         phone_len = 0
         word_len = len(group)
         if w == '[UNK]':
             phone_list = ['UNK']
         else:
-            phone_list = list(filter(lambda p: p != " ", fr_to_ipa.fr2ipa(w)))
+            phone_list = list(filter(lambda p: p != " ", ipa))
         
         for ph in phone_list:
             phones.append(ph)
@@ -63,9 +78,9 @@ def g2p(text, pad_start_end=True, tokenized=None):
         word2ph = [1] + word2ph + [1]
     return phones, tones, word2ph
 
-def get_bert_feature(text, word2ph, device=None):
+def get_bert_feature(text, word2ph, device=None, tokenized=None):
     from text import french_bert
-    return french_bert.get_bert_feature(text, word2ph, device=device)
+    return french_bert.get_bert_feature(text, word2ph, device=device, tokenized=tokenized)
 
 if __name__ == "__main__":
     ori_text = 'Ce service gratuit est“”"" 【disponible》 en chinois 【simplifié] et autres 123'
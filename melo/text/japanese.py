@@ -2,8 +2,9 @@
 # compatible with Julius https://github.com/julius-speech/segmentation-kit
 import re
 import unicodedata
+from functools import lru_cache
 
-from transformers import AutoTokenizer
+from .bert_utils import get_tokenizer, TokenizedText
 
 from . import symbols
 punctuation = ["!", "?", "…", ",", ".", "'", "-"]
@@ -323,7 +324,8 @@ _REJECT_RX = re.compile("[^ a-zA-Z:,.?]")
 
 
 def _makerulemap():
-    l = [tuple(x.split("/")) for x in _CONVRULES]
+    # the phonemes are split once here instead of on every match
+    l = [(k, tuple(v.split(" ")[1:])) for k, v in (x.split("/") for x in _CONVRULES)]
     return tuple({k: v for k, v in l if len(k) == i} for i in (1, 2))
 
 
@@ -334,20 +336,22 @@ def kata2phoneme(text: str) -> str:
     """Convert katakana text to phonemes."""
     text = text.strip()
     res = []
-    while text:
-        if len(text) >= 2:
-            x = _RULEMAP2.get(text[:2])
-            if x is not None:
-                text = text[2:]
-                res += x.split(" ")[1:]
-                continue
-        x = _RULEMAP1.get(text[0])
+    # walk the text by index, two-letter rules take precedence
+    i = 0
+    n = len(text)
+    while i < n:
+        x = _RULEMAP2.get(text[i: i + 2])
         if x is not None:
-            text = text[1:]
-            res += x.split(" ")[1:]
+            res += x
+            i += 2
             continue
-        res.append(text[0])
-        text = text[1:]
+        c = text[i]
+        x = _RULEMAP1.get(c)
+        if x is None:
+            res.append(c)
+        else:
+            res += x
+        i += 1
     # res = _COLON_RX.sub(":", res)
     return res
 
@@ -367,6 +371,7 @@ _NO_YOMI_TOKENS = set(list("「」『』―（）［］[]"))
 _TAGGER = MeCab.Tagger()
 
 
+@lru_cache(maxsize=4096)
 def text2kata(text: str) -> str:
     parsed = _TAGGER.parse(text)
     res = []
@@ -567,10 +572,24 @@ def distribute_phone(n_phone, n_word):
 # tokenizer = AutoTokenizer.from_pretrained('cl-tohoku/bert-base-japanese-v3')
 
 model_id = 'tohoku-nlp/bert-base-japanese-v3'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
-def g2p(norm_text):
+tokenizer = get_tokenizer(model_id)
+
+
+def tokenize(norm_text):
+    return TokenizedText(norm_text, model_id)
+
+_symbol_set = set(symbols)
+
+
+@lru_cache(maxsize=65536)
+def token_phonemes(text):
+    """kata2phoneme of a token, cached. The tuple is shared, do not modify it."""
+    return tuple(kata2phoneme(text))
+
 
-    tokenized = tokenizer.tokenize(norm_text)
+def g2p(norm_text, tokenized=None):
+    if tokenized is None:
+        tokenized = tokenizer.tokenize(norm_text)
     phs = []
     ph_groups = []
     for t in tokenized:
@@ -593,10 +612,10 @@ def g2p(norm_text):
             continue
         # import pdb; pdb.set_trace()
         # phonemes = japanese_text_to_phonemes(text)
-        phonemes = kata2phoneme(text)
+        phonemes = token_phonemes(text)
         # phonemes = [i for i in phonemes if i in symbols]
         for i in phonemes:
-            assert i in symbols, (group, norm_text, tokenized, i)
+            assert i in _symbol_set, (group, norm_text, tokenized, i)
         phone_len = len(phonemes)
         word_len = len(group)
 
@@ -611,10 +630,10 @@ def g2p(norm_text):
     assert len(word2ph) == len(tokenized) + 2
     return phones, tones, word2ph
 
-def get_bert_feature(text, word2ph, device):
+def get_bert_feature(text, word2ph, device, tokenized=None):
     from text import japanese_bert
 
-    return japanese_bert.get_bert_feature(text, word2ph, device=device)
+    return japanese_bert.get_bert_feature(text, word2ph, device=device, tokenized=tokenized)
 
 
 if __name__ == "__main__":
@@ -2,8 +2,9 @@
 # compatible with Julius https://github.com/julius-speech/segmentation-kit
 import re
 import unicodedata
+from functools import lru_cache
 
-from transformers import AutoTokenizer
+from .bert_utils import get_tokenizer, TokenizedText
 
 from . import punctuation, symbols
 
@@ -41,6 +42,16 @@ def normalize_english(text):
 
 
 g2p_kr = None
+def get_g2p_kr():
+    global g2p_kr  # pylint: disable=global-statement
+    if g2p_kr is None:
+        from g2pkk import G2p
+
+        g2p_kr = G2p()
+    return g2p_kr
+
+
+@lru_cache(maxsize=10000)
 def korean_text_to_phonemes(text, character: str = "hangeul") -> str:
     """
 
@@ -52,11 +63,7 @@ def korean_text_to_phonemes(text, character: str = "hangeul") -> str:
         output = '하늘' (Unicode :\u1112\u1161\u1102\u1173\u11af), (ᄒ + ᅡ + ᄂ + ᅳ + ᆯ)
 
     """
-    global g2p_kr  # pylint: disable=global-statement
-    if g2p_kr is None:
-        from g2pkk import G2p
-
-        g2p_kr = G2p()
+    g2p_kr = get_g2p_kr()
 
     if character == "english":
         from anyascii import anyascii
@@ -70,6 +77,47 @@ def korean_text_to_phonemes(text, character: str = "hangeul") -> str:
     text = list(hangul_to_jamo(text))  # '하늘' --> ['ᄒ', 'ᅡ', 'ᄂ', 'ᅳ', 'ᆯ']
     return "".join(text)
 
+
+@lru_cache(maxsize=1000)
+def sentence_to_hangul(text):
+    """The pronunciation g2pkk gives the whole sentence, before jamo decomposition.
+
+    Unlike converting word by word, g2pkk sees the morphemes in context and
+    applies the sound changes across word boundaries ('한 일의' -> '하 니릐').
+    """
+    text = normalize(text)
+    return text, get_g2p_kr()(text)
+
+
+def align_pronunciation(words, text, pron):
+    """The characters of pron that each of words spells in text.
+
+    The pronunciation keeps the syllable count of a Hangul word, so a word
+    of text is aligned character by character to the word of pron at the
+    same position when the two have the same length. The entry of a word
+    that cannot be aligned this way (numbers or English spelled out by
+    g2pkk, [UNK] tokens) is None.
+    """
+    chars = [None] * len(text)
+    spans = [m.span() for m in re.finditer(r"\S+", text)]
+    pron_words = pron.split()
+    if len(spans) == len(pron_words):
+        for (start, end), pron_word in zip(spans, pron_words):
+            if end - start == len(pron_word):
+                chars[start:end] = pron_word
+    res = []
+    pos = 0
+    for word in words:
+        word = unicodedata.normalize("NFC", word)
+        start = text.find(word, pos)
+        if not word or start < 0 or None in chars[start: start + len(word)]:
+            res.append(None)
+            continue
+        pos = start + len(word)
+        res.append("".join(chars[start: pos]))
+    return res
+
+
 def text_normalize(text):
     # res = unicodedata.normalize("NFKC", text)
     # res = japanese_convert_numbers_to_words(res)
@@ -92,10 +140,21 @@ def distribute_phone(n_phone, n_word):
 # tokenizer = AutoTokenizer.from_pretrained('cl-tohoku/bert-base-japanese-v3')
 
 model_id = 'kykim/bert-kor-base'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = get_tokenizer(model_id)
+
 
-def g2p(norm_text):
-    tokenized = tokenizer.tokenize(norm_text)
+def tokenize(norm_text):
+    return TokenizedText(norm_text, model_id)
+
+
+# Run g2pkk once on the whole sentence and split its pronunciation over the
+# word groups, instead of converting each word group on its own.
+sentence_level_g2p = True
+
+
+def g2p(norm_text, tokenized=None):
+    if tokenized is None:
+        tokenized = tokenizer.tokenize(norm_text)
     phs = []
     ph_groups = []
     for t in tokenized:
@@ -103,11 +162,13 @@ def g2p(norm_text):
             ph_groups.append([t])
         else:
             ph_groups[-1].append(t.replace("#", ""))
+    words = ["".join(group) for group in ph_groups]
+    if sentence_level_g2p:
+        prons = align_pronunciation(words, *sentence_to_hangul(norm_text))
+    else:
+        prons = [None] * len(words)
     word2ph = []
-    for group in ph_groups:
-        text = ""
-        for ch in group:
-            text += ch
+    for group, text, pron in zip(ph_groups, words, prons):
         if text == '[UNK]':
             phs += ['_']
             word2ph += [1]
@@ -119,7 +180,10 @@ def g2p(norm_text):
         # import pdb; pdb.set_trace()
         # phonemes = japanese_text_to_phonemes(text)
         # text = g2p_kr(text)
-        phonemes = korean_text_to_phonemes(text)
+        if pron is None:
+            phonemes = korean_text_to_phonemes(text)
+        else:
+            phonemes = "".join(hangul_to_jamo(pron))
         # import pdb; pdb.set_trace()
         # # phonemes = [i for i in phonemes if i in symbols]
         # for i in phonemes:
@@ -138,9 +202,14 @@ def g2p(norm_text):
     assert len(word2ph) == len(tokenized) + 2
     return phones, tones, word2ph
 
-def get_bert_feature(text, word2ph, device='cuda'):
+def get_bert_feature(text, word2ph, device='cuda', tokenized=None):
+    from . import japanese_bert
+    return japanese_bert.get_bert_feature(text, word2ph, device=device, model_id=model_id, tokenized=tokenized)
+
+
+def get_bert_feature_batch(texts, word2phs, device='cuda', tokenized=None):
     from . import japanese_bert
-    return japanese_bert.get_bert_feature(text, word2ph, device=device, model_id=model_id)
+    return japanese_bert.get_bert_feature_batch(texts, word2phs, device=device, model_id=model_id, tokenized=tokenized)
 
 
 if __name__ == "__main__":
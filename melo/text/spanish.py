@@ -5,7 +5,7 @@ import re
 from . import symbols
 from .es_phonemizer import cleaner as es_cleaner
 from .es_phonemizer import es_to_ipa
-from transformers import AutoTokenizer
+from .bert_utils import get_tokenizer, TokenizedText
 
 
 def distribute_phone(n_phone, n_word):
@@ -63,7 +63,17 @@ def refine_syllables(syllables):
 
 # model_id = 'bert-base-uncased'
 model_id = 'dccuchile/bert-base-spanish-wwm-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = get_tokenizer(model_id)
+
+
+def tokenize(norm_text):
+    return TokenizedText(norm_text, model_id)
+
+
+# Phonemize a whole sentence with one gruut pass instead of word by word. For
+# Spanish it gives the same phonemes as phonemizing each word on its own.
+sentence_level_g2p = True
+
 
 def g2p(text, pad_start_end=True, tokenized=None):
     if tokenized is None:
@@ -80,15 +90,19 @@ def g2p(text, pad_start_end=True, tokenized=None):
     phones = []
     tones = []
     word2ph = []
+    words = ["".join(group) for group in ph_groups]
+    if sentence_level_g2p:
+        ipas = es_to_ipa.words2ipa(words)
+    else:
+        ipas = [es_to_ipa.word2ipa(w) for w in words]
     # print(ph_groups)
-    for group in ph_groups:
-        w = "".join(group)
+    for group, w, ipa in zip(ph_groups, words, ipas):
         phone_len = 0
         word_len = len(group)
         if w == '[UNK]':
             phone_list = ['UNK']
         else:
-            phone_list = list(filter(lambda p: p != " ", es_to_ipa.es2ipa(w)))
+            phone_list = list(filter(lambda p: p != " ", ipa))
         
         for ph in phone_list:
             phones.append(ph)
@@ -105,9 +119,9 @@ def g2p(text, pad_start_end=True, tokenized=None):
         word2ph = [1] + word2ph + [1]
     return phones, tones, word2ph
 
-def get_bert_feature(text, word2ph, device=None):
+def get_bert_feature(text, word2ph, device=None, tokenized=None):
     from text import spanish_bert
-    return spanish_bert.get_bert_feature(text, word2ph, device=device)
+    return spanish_bert.get_bert_feature(text, word2ph, device=device, tokenized=tokenized)
 
 if __name__ == "__main__":
     text = "en nuestros tiempos estos dos pueblos ilustres empiezan a curarse, gracias sólo a la sana y vigorosa higiene de 1789."
@@ -1,12 +1,17 @@
 import torch
-from transformers import AutoTokenizer, AutoModelForMaskedLM
 import sys
 
+from .bert_utils import load_bert_encoder, get_phone_level_features, get_tokenizer
+
 model_id = 'dccuchile/bert-base-spanish-wwm-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+tokenizer = get_tokenizer(model_id)
 model = None
 
-def get_bert_feature(text, word2ph, device=None):
+def get_bert_feature(text, word2ph, device=None, tokenized=None):
+    return get_bert_feature_batch([text], [word2ph], device=device, tokenized=None if tokenized is None else [tokenized])[0]
+
+
+def get_bert_feature_batch(texts, word2phs, device=None, tokenized=None):
     global model
     if (
         sys.platform == "darwin"
@@ -17,23 +22,5 @@ def get_bert_feature(text, word2ph, device=None):
     if not device:
         device = "cuda"
     if model is None:
-        model = AutoModelForMaskedLM.from_pretrained(model_id).to(
-            device
-        )
-    with torch.no_grad():
-        inputs = tokenizer(text, return_tensors="pt")
-        for i in inputs:
-            inputs[i] = inputs[i].to(device)
-        res = model(**inputs, output_hidden_states=True)
-        res = torch.cat(res["hidden_states"][-3:-2], -1)[0].cpu()
-        
-    assert inputs["input_ids"].shape[-1] == len(word2ph)
-    word2phone = word2ph
-    phone_level_feature = []
-    for i in range(len(word2phone)):
-        repeat_feature = res[i].repeat(word2phone[i], 1)
-        phone_level_feature.append(repeat_feature)
-
-    phone_level_feature = torch.cat(phone_level_feature, dim=0)
-
-    return phone_level_feature.T
+        model = load_bert_encoder(model_id, device)
+    return get_phone_level_features(model, tokenizer, texts, word2phs, device, tokenized=tokenized)
@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from functools import lru_cache
 from typing import List
 from typing import Tuple
 
@@ -19,9 +20,20 @@ from pypinyin import lazy_pinyin
 from pypinyin import Style
 
 
+@lru_cache(maxsize=65536)
+def word_finals(word: str) -> Tuple[str, ...]:
+    """FINALS_TONE3 pinyin of word. Cached, callers must copy it before changing it."""
+    return tuple(lazy_pinyin(word, neutral_tone_with_five=True, style=Style.FINALS_TONE3))
+
+
+@lru_cache(maxsize=65536)
+def _cut_for_search(word: str) -> Tuple[str, ...]:
+    return tuple(jieba.cut_for_search(word))
+
+
 class ToneSandhi:
     def __init__(self):
-        self.must_neural_tone_words = {
+        self.must_neural_tone_words = frozenset({
             "麻烦",
             "麻利",
             "鸳鸯",
@@ -442,8 +454,8 @@ class ToneSandhi:
             "咖喱",
             "扫把",
             "惦记",
-        }
-        self.must_not_neural_tone_words = {
+        })
+        self.must_not_neural_tone_words = frozenset({
             "男子",
             "女子",
             "分子",
@@ -455,7 +467,7 @@ class ToneSandhi:
             "电子",
             "人人",
             "虎虎",
-        }
+        })
         self.punc = "：，；。？！“”‘’':,;.?!"
 
     # the meaning of jieba pos tag: https://blog.csdn.net/weixin_44174352/article/details/113731041
@@ -556,7 +568,7 @@ class ToneSandhi:
         return finals
 
     def _split_word(self, word: str) -> List[str]:
-        word_list = jieba.cut_for_search(word)
+        word_list = _cut_for_search(word)
         word_list = sorted(word_list, key=lambda i: len(i), reverse=False)
         first_subword = word_list[0]
         first_begin_idx = word.find(first_subword)
@@ -670,10 +682,7 @@ class ToneSandhi:
         self, seg: List[Tuple[str, str]]
     ) -> List[Tuple[str, str]]:
         new_seg = []
-        sub_finals_list = [
-            lazy_pinyin(word, neutral_tone_with_five=True, style=Style.FINALS_TONE3)
-            for (word, pos) in seg
-        ]
+        sub_finals_list = [word_finals(word) for (word, pos) in seg]
         assert len(sub_finals_list) == len(seg)
         merge_last = [False] * len(seg)
         for i, (word, pos) in enumerate(seg):
@@ -705,10 +714,7 @@ class ToneSandhi:
         self, seg: List[Tuple[str, str]]
     ) -> List[Tuple[str, str]]:
         new_seg = []
-        sub_finals_list = [
-            lazy_pinyin(word, neutral_tone_with_five=True, style=Style.FINALS_TONE3)
-            for (word, pos) in seg
-        ]
+        sub_finals_list = [word_finals(word) for (word, pos) in seg]
         assert len(sub_finals_list) == len(seg)
         merge_last = [False] * len(seg)
         for i, (word, pos) in enumerate(seg):
@@ -9,8 +9,8 @@ from scipy.io.wavfile import read
 import torch
 import torchaudio
 import librosa
-from melo.text import cleaned_text_to_sequence, get_bert
-from melo.text.cleaner import clean_text
+from melo.text import cleaned_text_to_sequence, get_bert_batch, _symbol_to_id
+from melo.text.cleaner import clean_text_tokenized
 from melo import commons
 import pyloudnorm as pyln
 
@@ -43,43 +43,120 @@ def fix_loudness(input, rate, target_lufs=-16.0, max_peak_dbfs=-2.0):
     return final_audio
 
 def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None):
-    norm_text, phone, tone, word2ph = clean_text(text, language_str)
-    phone, tone, language = cleaned_text_to_sequence(phone, tone, language_str, symbol_to_id)
+    return get_texts_for_tts_infer([text], language_str, hps, device, symbol_to_id)[0]
+
+
+def get_texts_for_tts_infer(texts, language_str, hps, device, symbol_to_id=None):
+    """get_text_for_tts_infer for several texts, with one BERT forward over all of them."""
+    cleaned = []
+    tokenized = []
+    for text in texts:
+        norm_text, phone, tone, word2ph, tokens = clean_text_tokenized(text, language_str)
+        tokenized.append(tokens)
+        phone, tone, language, word2ph = phonemes_to_sequence(phone, tone, word2ph, language_str, hps, symbol_to_id)
+        cleaned.append((norm_text, phone, tone, language, word2ph))
+
+    disable_bert = getattr(hps.data, "disable_bert", False)
+    if not disable_bert:
+        berts = get_bert_batch(
+            [c[0] for c in cleaned], [c[4] for c in cleaned], language_str, device,
+            tokenized=None if None in tokenized else tokenized,
+        )
 
+    results = []
+    for i, (norm_text, phone, tone, language, word2ph) in enumerate(cleaned):
+        results.append(sequence_to_infer_inputs(None if disable_bert else berts[i], phone, tone, language, language_str))
+    return results
+
+
+def check_phonemes(phone, tone, word2ph, symbol_to_id=None):
+    """Raises a ValueError if phone, tone and word2ph (as clean_text returns them)
+    do not fit together or use symbols missing from symbol_to_id."""
+    symbol_to_id = symbol_to_id if symbol_to_id else _symbol_to_id
+    unknown = sorted(set(p for p in phone if p not in symbol_to_id))
+    if unknown:
+        raise ValueError(f"unknown phones {unknown}")
+    if len(tone) != len(phone):
+        raise ValueError(f"{len(tone)} tones for {len(phone)} phones")
+    if any(t < 0 for t in tone):
+        raise ValueError("tones must not be negative")
+    if word2ph is not None and sum(word2ph) != len(phone):
+        raise ValueError(f"word2ph covers {sum(word2ph)} phones, not {len(phone)}")
+
+
+def phonemes_to_sequence(phone, tone, word2ph, language_str, hps, symbol_to_id=None):
+    """The symbol ids of the clean_text outputs, interspersed with blanks if the model uses them."""
+    phone, tone, language = cleaned_text_to_sequence(phone, tone, language_str, symbol_to_id)
     if hps.data.add_blank:
         phone = commons.intersperse(phone, 0)
         tone = commons.intersperse(tone, 0)
         language = commons.intersperse(language, 0)
-        for i in range(len(word2ph)):
-            word2ph[i] = word2ph[i] * 2
-        word2ph[0] += 1
+        if word2ph is not None:
+            word2ph = commons.intersperse_word2ph(word2ph)
+    return phone, tone, language, word2ph
 
-    if getattr(hps.data, "disable_bert", False):
-        bert = torch.zeros(1024, len(phone))
-        ja_bert = torch.zeros(768, len(phone))
-    else:
-        bert = get_bert(norm_text, word2ph, language_str, device)
-        del word2ph
-        assert bert.shape[-1] == len(phone), phone
+
+def sequence_to_infer_inputs(bert, phone, tone, language, language_str):
+    """The (bert, ja_bert, phone, tone, language) tensors of get_text_for_tts_infer.
+
+    bert is the feature get_bert returns for the language, or None for zeros.
+    The feature the language does not use is None instead of zeros, which
+    the text encoder replaces with the bias of its projection.
+    """
+    ja_bert = None
+    if bert is not None:
+        assert bert.shape[-1] == len(
+            phone
+        ), f"Bert seq len {bert.shape[-1]} != {len(phone)}"
 
         if language_str == "ZH":
-            bert = bert
-            ja_bert = torch.zeros(768, len(phone))
+            pass
         elif language_str in ["JP", "EN", "ZH_MIX_EN", 'KR', 'SP', 'ES', 'FR', 'DE', 'RU']:
             ja_bert = bert
-            bert = torch.zeros(1024, len(phone))
+            bert = None
         else:
             raise NotImplementedError()
 
-    assert bert.shape[-1] == len(
-        phone
-    ), f"Bert seq len {bert.shape[-1]} != {len(phone)}"
-
     phone = torch.LongTensor(phone)
     tone = torch.LongTensor(tone)
     language = torch.LongTensor(language)
     return bert, ja_bert, phone, tone, language
 
+
+def _pad_feature(features, max_text_len):
+    """Zero-pads BERT features into [b, channels, max_text_len], None if all of them are None."""
+    present = [f for f in features if f is not None]
+    if not present:
+        return None
+    padded = torch.zeros(len(features), present[0].size(0), max_text_len, dtype=present[0].dtype)
+    for i, feature in enumerate(features):
+        if feature is not None:
+            padded[i, :, : feature.size(1)] = feature
+    return padded
+
+
+def pad_text_for_tts_infer(batch):
+    """Zero-pads the outputs of several get_text_for_tts_infer calls into one batch
+    PARAMS
+    ------
+    batch: [(bert, ja_bert, phone, tone, language), ...]
+    bert and ja_bert may be None (zeros), and are None in the batch if all of them are.
+    """
+    max_text_len = max([x[2].size(0) for x in batch])
+
+    text_lengths = torch.LongTensor(len(batch))
+    text_padded = torch.zeros(len(batch), max_text_len, dtype=torch.long)
+    tone_padded = torch.zeros(len(batch), max_text_len, dtype=torch.long)
+    language_padded = torch.zeros(len(batch), max_text_len, dtype=torch.long)
+    for i, (bert, ja_bert, phone, tone, language) in enumerate(batch):
+        text_lengths[i] = phone.size(0)
+        text_padded[i, : phone.size(0)] = phone
+        tone_padded[i, : tone.size(0)] = tone
+        language_padded[i, : language.size(0)] = language
+    bert_padded = _pad_feature([x[0] for x in batch], max_text_len)
+    ja_bert_padded = _pad_feature([x[1] for x in batch], max_text_len)
+    return bert_padded, ja_bert_padded, text_padded, text_lengths, tone_padded, language_padded
+
 def load_checkpoint(checkpoint_path, model, optimizer=None, skip_optimizer=False):
     assert os.path.isfile(checkpoint_path)
     checkpoint_dict = torch.load(checkpoint_path, map_location="cpu")
@@ -0,0 +1,51 @@
+"""Latency of the relative-position attention in the text encoder and the
+transformer flow, reference (training) path against the inference path.
+
+Usage: python benchmark_attention.py [device]
+"""
+import sys
+import time
+
+import torch
+
+from melo import commons
+from melo.attentions import Encoder
+from melo.models import TransformerCouplingBlock
+
+
+def timeit(fn, repeats=5):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def bench(name, module, make_args, device, lengths=(50, 100, 200, 500, 1000)):
+    print(f' > {name} (ms)')
+    module = module.to(device)
+    for length in lengths:
+        args = make_args(length)
+        with torch.no_grad():
+            # p_dropout=0, so train mode only differs by the attention path
+            reference = timeit(lambda: module.train()(*args)) * 1000
+            fast = timeit(lambda: module.eval()(*args)) * 1000
+        print(f'   length={length:<5d} reference={reference:8.1f} inference={fast:8.1f} speedup={reference / fast:.2f}x')
+
+
+if __name__ == '__main__':
+    device = sys.argv[1] if len(sys.argv) > 1 else 'cpu'
+    # the sizes of melo/configs/config.json
+    encoder = Encoder(192, 768, 2, 6, 3, p_dropout=0., gin_channels=256)
+    flow = TransformerCouplingBlock(192, 192, 768, 2, 3, 5, 0., 4, gin_channels=256)
+
+    def encoder_args(length):
+        x_mask = commons.sequence_mask(torch.tensor([length]), length).unsqueeze(1).float().to(device)
+        return torch.randn(1, 192, length, device=device), x_mask, torch.randn(1, 256, 1, device=device)
+
+    def flow_args(length):
+        x, x_mask, g = encoder_args(length)
+        return x, x_mask, g, True
+
+    bench('text encoder', encoder, encoder_args, device)
+    bench('transformer flow (reverse)', flow, flow_args, device)
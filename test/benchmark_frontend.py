@@ -0,0 +1,149 @@
+"""Latency benchmark for the text frontend.
+
+Usage: python benchmark_frontend.py EN [device] [corpus.txt]
+
+corpus.txt (one paragraph per line) replaces the example text of the
+language, e.g. a Chinese news corpus for ZH.
+"""
+import sys
+import time
+
+import torch
+
+from melo import commons
+from melo.split_utils import split_sentence
+from melo.text import get_bert, get_bert_batch
+from melo.text.bert_utils import expand_to_phones
+from melo.text.cleaner import clean_text, get_language_module
+
+RESOURCES = {
+    'EN': 'en_egs_text.txt', 'ES': 'es_egs_text.txt', 'FR': 'fr_egs_text.txt',
+    'ZH_MIX_EN': 'zh_mix_en_egs_text.txt', 'JP': 'jp_egs_text.txt', 'KR': 'kr_egs_text.txt',
+}
+
+
+def load_sentences(language, path=None):
+    if path is None:
+        # there is no pure Chinese example text, the mixed one is mostly Chinese
+        path = f'basetts_test_resources/{RESOURCES.get(language, RESOURCES["ZH_MIX_EN"])}'
+    text = ' '.join(open(path).read().split('\n'))
+    return split_sentence(text, language_str=language)
+
+
+def timeit(fn, repeats=3):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def bench_bert(language, sentences, device):
+    cleaned = []
+    for sentence in sentences:
+        norm_text, phones, tones, word2ph = clean_text(sentence, language)
+        # the blank-interspersed word2ph of utils.phonemes_to_sequence (add_blank models)
+        word2ph = commons.intersperse_word2ph(word2ph)
+        cleaned.append((norm_text, word2ph))
+
+    def run():
+        for norm_text, word2ph in cleaned:
+            get_bert(norm_text, list(word2ph), language, device)
+
+    def run_batch():
+        get_bert_batch([c[0] for c in cleaned], [list(c[1]) for c in cleaned], language, device)
+    run()
+    print(f' > get_bert: {timeit(run) / len(sentences) * 1000:.1f} ms/sentence')
+    print(f' > get_bert_batch: {timeit(run_batch) / len(sentences) * 1000:.1f} ms/sentence')
+
+
+def bench_gruut(language, sentences):
+    """FR/ES phonemization of the tokenizer word groups: word by word as before,
+    with the per-word memo cache, and with one gruut pass per sentence."""
+    module = get_language_module(language)
+    ipa = module.fr_to_ipa if language == 'FR' else module.es_to_ipa
+    groups = []
+    for sentence in sentences:
+        tokens = list(module.tokenize(module.text_normalize(sentence)))
+        words = []
+        for t in tokens:
+            if t.startswith('#') and words:
+                words[-1] += t.replace('#', '')
+            else:
+                words.append(t)
+        groups.append(words)
+    n_words = sum(map(len, groups))
+
+    def per_word():
+        for words in groups:
+            [ipa.word2ipa.__wrapped__(w) for w in words]
+
+    def memo():
+        for words in groups:
+            [ipa.word2ipa(w) for w in words]
+
+    def sentence_level():
+        for words in groups:
+            ipa.words2ipa(words)
+    print(f' > gruut, {n_words} words: per word {timeit(per_word, 1) / n_words * 1000:.2f} ms/word, '
+          f'memo cache (warm) {timeit(memo) / n_words * 1000:.3f} ms/word, '
+          f'sentence level {timeit(sentence_level, 1) / n_words * 1000:.2f} ms/word')
+
+
+def bench_zh_g2p(language, sentences):
+    """Chinese g2p, the first pass fills the (word, pos) pinyin and sandhi caches."""
+    module = get_language_module(language)
+    norm_texts = [module.text_normalize(sentence) for sentence in sentences]
+
+    def run():
+        for norm_text in norm_texts:
+            module.g2p(norm_text)
+    cold = timeit(run, 1)
+    print(f' > g2p: first pass {cold / len(sentences) * 1000:.2f} ms/sentence, '
+          f'cached {timeit(run) / len(sentences) * 1000:.2f} ms/sentence')
+
+
+def bench_kr_g2p(language, sentences):
+    """Korean g2p on CPU, g2pkk run per word group and once per sentence."""
+    module = get_language_module(language)
+    norm_texts = [module.text_normalize(sentence) for sentence in sentences]
+    tokenized = [module.tokenize(norm_text) for norm_text in norm_texts]
+
+    def run():
+        for norm_text, tokens in zip(norm_texts, tokenized):
+            module.g2p(norm_text, tokenized=tokens)
+    module.g2p(norm_texts[0])
+    for sentence_level in (False, True):
+        module.sentence_level_g2p = sentence_level
+        module.korean_text_to_phonemes.cache_clear()
+        module.sentence_to_hangul.cache_clear()
+        cold = timeit(run, 1)
+        print(f' > g2p, {"per sentence" if sentence_level else "per word group"}: '
+              f'first pass {cold / len(sentences) * 1000:.2f} ms/sentence, '
+              f'cached {timeit(run) / len(sentences) * 1000:.2f} ms/sentence')
+
+
+def bench_expand(n_tokens=2000, dim=1024):
+    res = torch.randn(n_tokens, dim)
+    word2ph = torch.randint(1, 8, (n_tokens,)).tolist()
+
+    def loop():
+        torch.cat([res[i].repeat(word2ph[i], 1) for i in range(len(word2ph))], dim=0).T
+
+    print(f' > word2ph expansion of {n_tokens} tokens: '
+          f'loop {timeit(loop) * 1000:.2f} ms, '
+          f'expand_to_phones {timeit(lambda: expand_to_phones(res, word2ph)) * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    language = sys.argv[1] if len(sys.argv) > 1 else 'EN'
+    device = sys.argv[2] if len(sys.argv) > 2 else 'cpu'
+    sentences = load_sentences(language, sys.argv[3] if len(sys.argv) > 3 else None)
+    print(f'{language}: {len(sentences)} sentences')
+    bench_expand()
+    if language in ('FR', 'ES'):
+        bench_gruut(language, sentences)
+    if language in ('ZH', 'ZH_MIX_EN'):
+        bench_zh_g2p(language, sentences)
+    if language == 'KR':
+        bench_kr_g2p(language, sentences)
+    bench_bert(language, sentences, device)
@@ -0,0 +1,34 @@
+"""Import time and memory of `import melo.api`, and of a first call per language.
+
+Usage: python benchmark_import.py [EN ZH ...]
+"""
+import subprocess
+import sys
+import time
+
+FIRST_CALL = 'import melo.api; from melo.text.cleaner import clean_text; clean_text({text!r}, {language!r})'
+SAMPLE_TEXT = {
+    'EN': 'Hello world.', 'ES': 'Hola mundo.', 'FR': 'Bonjour le monde.', 'ZH': '你好世界。',
+    'ZH_MIX_EN': '你好 world。', 'JP': 'こんにちは世界。', 'KR': '안녕하세요 세계.',
+}
+
+
+def run(code, repeats=3):
+    """Best wall time and peak RSS of a fresh interpreter running code."""
+    code += '; import resource; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)'
+    best, rss = float('inf'), 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+        best = min(best, time.perf_counter() - start)
+        rss = int(out.split()[-1])
+    return best, rss / 1024
+
+
+if __name__ == '__main__':
+    languages = sys.argv[1:] or ['EN']
+    seconds, mb = run('import melo.api')
+    print(f' > import melo.api: {seconds:.2f} s, {mb:.0f} MB peak RSS')
+    for language in languages:
+        seconds, mb = run(FIRST_CALL.format(text=SAMPLE_TEXT[language], language=language))
+        print(f' > import melo.api + first {language} clean_text: {seconds:.2f} s, {mb:.0f} MB peak RSS')
@@ -0,0 +1,103 @@
+"""Real-time-factor benchmark for melo.api.TTS.
+
+Usage: python benchmark_infer.py EN [device]
+"""
+import sys
+import time
+
+import torch
+
+from melo.api import TTS
+from melo.document import DocumentStats, available_cores
+from melo.pipeline import PipelineStats
+
+
+def rtf(model, fn, repeats=3):
+    elapsed, n_samples = 0., 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        audio = fn()
+        elapsed += time.perf_counter() - start
+        n_samples += len(audio)
+    return elapsed / (n_samples / model.hps.data.sampling_rate)
+
+
+def bench_batch_size(model, text, speaker_id, batch_sizes=(1, 4, 8, 16)):
+    print(' > tts_to_file batch size (rtf, lower is better)')
+    for batch_size in batch_sizes:
+        torch.manual_seed(0)
+        value = rtf(model, lambda: model.tts_to_file(text, speaker_id, quiet=True, batch_size=batch_size))
+        print(f'   batch_size={batch_size:<3d} rtf={value:.4f}')
+
+
+def bench_first_audio(model, text, speaker_id, repeats=3):
+    print(' > time to first audio (s)')
+    for chunk_size in [None, 16, 64]:
+        first, total = 0., 0.
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for i, chunk in enumerate(model.tts_iter(text, speaker_id, quiet=True, chunk_size=chunk_size)):
+                if i == 0:
+                    first += time.perf_counter() - start
+            total += time.perf_counter() - start
+        print(f'   chunk_size={chunk_size} first chunk={first / repeats:.3f} total={total / repeats:.3f}')
+
+
+def bench_prefetch(model, text, speaker_id, bert_batch_size=4):
+    print(f' > frontend on a worker thread (bert_batch_size={bert_batch_size})')
+    for prefetch in [0, 1, 2]:
+        torch.manual_seed(0)
+        stats = PipelineStats()
+        value = rtf(model, lambda: model.tts_to_file(text, speaker_id, quiet=True, bert_batch_size=bert_batch_size, prefetch=prefetch, stats=stats), repeats=1)
+        print(f'   prefetch={prefetch} rtf={value:.4f} {stats}')
+
+
+def bench_fast_path(model, text, speaker_id, repeats=3):
+    print(f' > skipped predictors and BERT projections ({model.language}, ms per sentence)')
+    inputs = model.get_text_inputs_batch(model.split_sentences_into_pieces(text, model.language, quiet=True))
+    # the unused BERT features as zero tensors, as before they were omitted
+    zero_filled = [
+        (torch.zeros(1024, len(x[2])) if x[0] is None else x[0], torch.zeros(768, len(x[2])) if x[1] is None else x[1]) + x[2:]
+        for x in inputs
+    ]
+    for name, items in [('zero features', zero_filled), ('omitted features', inputs)]:
+        for sdp_ratio in [0.2, 0.]:
+            torch.manual_seed(0)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                for item in items:
+                    model.infer_batch([item], speaker_id, sdp_ratio=sdp_ratio)
+            elapsed = (time.perf_counter() - start) / repeats / len(items)
+            print(f'   {name:<16s} sdp_ratio={sdp_ratio} {elapsed * 1000:.1f}')
+
+
+def bench_document(model, text, speaker_id, threads_per_worker=2):
+    print(f' > document mode, {threads_per_worker} cores per worker (throughput, higher is better)')
+    n_cores = len(available_cores())
+    n_workers = 1
+    while n_workers * threads_per_worker <= n_cores:
+        stats = DocumentStats()
+        model.tts_document(text, speaker_id, quiet=True, n_workers=n_workers, threads_per_worker=threads_per_worker, shard_size=1, stats=stats)
+        print(f'   n_workers={n_workers:<3d} {stats.throughput:.2f}x real time, {stats.throughput / n_workers:.2f} per worker')
+        n_workers *= 2
+
+
+if __name__ == '__main__':
+    language = sys.argv[1] if len(sys.argv) > 1 else 'EN'
+    device = sys.argv[2] if len(sys.argv) > 2 else 'cpu'
+    resources = {
+        'EN': 'en_egs_text.txt', 'ES': 'es_egs_text.txt', 'FR': 'fr_egs_text.txt',
+        'ZH': 'zh_mix_en_egs_text.txt', 'JP': 'jp_egs_text.txt', 'KR': 'kr_egs_text.txt',
+    }
+    text = ' '.join(open(f'basetts_test_resources/{resources[language]}').read().split('\n'))
+    model = TTS(language=language, device=device)
+    speaker_id = list(model.hps.data.spk2id.values())[0]
+    # warm up the frontend and BERT before timing
+    model.tts_to_file(text[:200], speaker_id, quiet=True)
+
+    bench_batch_size(model, text, speaker_id)
+    bench_first_audio(model, text, speaker_id)
+    bench_prefetch(model, text, speaker_id)
+    bench_fast_path(model, text, speaker_id)
+    if device == 'cpu':
+        bench_document(model, text * 8, speaker_id)
@@ -0,0 +1,54 @@
+"""Parameters and resident memory of a loaded TTS model, full against inference-only.
+
+Usage: python benchmark_model_memory.py EN [config.json checkpoint.pth]
+
+Each model is loaded in its own process, so the RSS of one does not
+include the other.
+"""
+import multiprocessing
+import resource
+import sys
+
+
+def current_rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def load(language, config_path, ckpt_path, inference_only, results):
+    import torch
+    from melo.api import TTS
+    torch.set_num_threads(1)
+    before = current_rss_mb()
+    model = TTS(language, device='cpu', config_path=config_path, ckpt_path=ckpt_path, inference_only=inference_only)
+    results.put(dict(
+        params=sum(p.numel() for p in model.model.parameters()),
+        rss=current_rss_mb() - before,
+        # ru_maxrss is in kB on Linux
+        peak=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    ))
+
+
+def measure(language, config_path, ckpt_path, inference_only):
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    process = ctx.Process(target=load, args=(language, config_path, ckpt_path, inference_only, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+if __name__ == '__main__':
+    language = sys.argv[1] if len(sys.argv) > 1 else 'EN'
+    config_path, ckpt_path = (sys.argv[2], sys.argv[3]) if len(sys.argv) > 3 else (None, None)
+    full = measure(language, config_path, ckpt_path, False)
+    small = measure(language, config_path, ckpt_path, True)
+    print(f' > {language} model')
+    for name, result in [('full', full), ('inference_only', small)]:
+        print(f'   {name:<15s} params={result["params"] / 1e6:.2f}M rss={result["rss"]:.0f} MB peak={result["peak"]:.0f} MB')
+    print(f'   saved {(full["params"] - small["params"]) / 1e6:.2f}M params ({1 - small["params"] / full["params"]:.0%}), '
+          f'{full["rss"] - small["rss"]:.0f} MB rss, {full["peak"] - small["peak"]:.0f} MB peak')
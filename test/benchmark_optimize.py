@@ -0,0 +1,40 @@
+"""CPU latency of the decoder and the flow before and after optimize_for_inference.
+
+Usage: python benchmark_optimize.py [n_threads]
+"""
+import sys
+import time
+
+import torch
+
+from test_batched_infer import build_model
+
+
+def timeit(fn, repeats=5):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def bench(name, run, reference, optimized, lengths=(100, 300, 1000)):
+    print(f' > {name} (ms)')
+    g = reference.emb_g(torch.LongTensor([0])).unsqueeze(-1).detach()
+    for frames in lengths:
+        z = torch.randn(1, 192, frames)
+        y_mask = torch.ones(1, 1, frames)
+        with torch.no_grad():
+            before = timeit(lambda: run(reference, z, y_mask, g)) * 1000
+            after = timeit(lambda: run(optimized, z, y_mask, g)) * 1000
+        print(f'   frames={frames:<5d} before={before:8.1f} after={after:8.1f} speedup={before / after:.2f}x')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        torch.set_num_threads(int(sys.argv[1]))
+    reference, _ = build_model()
+    optimized, _ = build_model()
+    optimized.optimize_for_inference()
+    bench('dec', lambda model, z, y_mask, g: model.dec(z, g=g), reference, optimized)
+    bench('flow (reverse)', lambda model, z, y_mask, g: model.flow(z, y_mask, g=g, reverse=True), reference, optimized)
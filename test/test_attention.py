@@ -0,0 +1,43 @@
+import torch
+
+from melo import commons
+from melo.attentions import Encoder, MultiHeadAttention
+
+
+def masks(lengths, t):
+    x_mask = commons.sequence_mask(torch.tensor(lengths), t).unsqueeze(1).float()
+    return x_mask, x_mask.unsqueeze(2) * x_mask.unsqueeze(-1)
+
+
+def test_inference_attention_matches_attention():
+    torch.manual_seed(0)
+    for window_size, proximal_bias in [(4, False), (1, True), (None, False), (None, True)]:
+        attn = MultiHeadAttention(192, 192, 2, window_size=window_size, proximal_bias=proximal_bias).eval()
+        # lengths below, at and above the window
+        for t in [1, 3, 5, 60]:
+            x_mask, attn_mask = masks([t, max(1, t - 2)], t)
+            x = torch.randn(2, 192, t)
+            q, k, v = attn.conv_q(x), attn.conv_k(x), attn.conv_v(x)
+            with torch.no_grad():
+                expected, _ = attn.attention(q, k, v, mask=attn_mask)
+                output = attn.inference_attention(q, k, v, mask=attn_mask)
+            # padded query rows are masked by the callers
+            assert torch.allclose(output * x_mask, expected * x_mask, atol=1e-5)
+
+
+def test_encoder_inference_path():
+    torch.manual_seed(0)
+    # without dropout, train mode runs the reference attention with the same weights
+    encoder = Encoder(192, 768, 2, 6, 3, p_dropout=0.)
+    x_mask, _ = masks([80, 51], 80)
+    x = torch.randn(2, 192, 80)
+    with torch.no_grad():
+        expected = encoder.train()(x, x_mask)
+        output = encoder.eval()(x, x_mask)
+    assert torch.allclose(output, expected, atol=1e-5)
+    assert all(layer.attn is None for layer in encoder.attn_layers)
+
+
+if __name__ == '__main__':
+    test_inference_attention_matches_attention()
+    test_encoder_inference_path()
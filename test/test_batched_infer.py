@@ -0,0 +1,154 @@
+import os
+
+import torch
+
+from melo import commons, utils
+from melo.models import SynthesizerTrn
+
+
+def build_model(n_vocab=100, n_speakers=4):
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'melo', 'configs', 'config.json')
+    hps = utils.get_hparams_from_file(config_path)
+    torch.manual_seed(0)
+    model = SynthesizerTrn(
+        n_vocab,
+        hps.data.filter_length // 2 + 1,
+        hps.train.segment_size // hps.data.hop_length,
+        n_speakers=n_speakers,
+        num_tones=16,
+        num_languages=10,
+        **hps.model,
+    ).eval()
+    return model, hps
+
+
+def random_text_inputs(length, n_vocab=100):
+    bert = torch.zeros(1024, length)
+    ja_bert = torch.randn(768, length)
+    phone = torch.randint(1, n_vocab, (length,))
+    tone = torch.randint(0, 16, (length,))
+    language = torch.randint(0, 10, (length,))
+    return bert, ja_bert, phone, tone, language
+
+
+def infer(model, inputs):
+    bert, ja_bert, x, x_lengths, tone, language = utils.pad_text_for_tts_infer(inputs)
+    sid = torch.LongTensor([0] * len(inputs))
+    # noise_scale=0 and sdp_ratio=0 make the forward pass deterministic
+    o, _, y_mask, _ = model.infer(x, x_lengths, sid, tone, language, bert, ja_bert, noise_scale=0, sdp_ratio=0)
+    return o, y_mask
+
+
+def reorder(padded, sid):
+    """The model.infer arguments of a padded batch."""
+    bert, ja_bert, x, x_lengths, tone, language = padded
+    return x, x_lengths, sid, tone, language, bert, ja_bert
+
+
+def test_batched_infer_matches_per_sentence():
+    model, hps = build_model()
+    inputs = [random_text_inputs(n) for n in (21, 37, 9)]
+    with torch.no_grad():
+        o, y_mask = infer(model, inputs)
+        y_lengths = y_mask.sum([1, 2]).long() * hps.data.hop_length
+        for i, item in enumerate(inputs):
+            single, _ = infer(model, [item])
+            batched = o[i, 0, :y_lengths[i]]
+            assert batched.shape == single[0, 0].shape
+            assert torch.allclose(batched, single[0, 0], atol=1e-5)
+
+
+def test_chunked_decoder_matches_full_decoding():
+    model, _ = build_model()
+    z = torch.randn(2, 192, 150)
+    with torch.no_grad():
+        full = model.dec(z)
+        for chunk_size, overlap in [(8, 0), (32, 2), (64, 4)]:
+            chunked = torch.cat(list(model.dec.forward_chunked(z, chunk_size=chunk_size, overlap=overlap)), -1)
+            assert chunked.shape == full.shape
+            assert torch.allclose(chunked, full, atol=1e-5)
+        # a context smaller than the receptive field only differs near window borders
+        chunked = torch.cat(list(model.dec.forward_chunked(z, chunk_size=32, overlap=4, context=4)), -1)
+        assert (chunked - full).abs().max() < 1e-2
+
+
+def test_index_expansion_matches_attention_path():
+    torch.manual_seed(0)
+    for _ in range(50):
+        t_x = int(torch.randint(1, 30, ()))
+        x_lengths = torch.randint(1, t_x + 1, (3,))
+        x_lengths[0] = t_x
+        x_mask = commons.sequence_mask(x_lengths, t_x).unsqueeze(1).float()
+        # whole durations, some phones get no frames
+        w_ceil = torch.ceil(torch.rand(3, 1, t_x) * 4) * (torch.rand(3, 1, t_x) > 0.2) * x_mask
+        y_lengths = torch.clamp_min(w_ceil.sum([1, 2]), 1).long()
+        y_mask = commons.sequence_mask(y_lengths, None).unsqueeze(1).float()
+        attn = commons.generate_path(w_ceil, x_mask.unsqueeze(2) * y_mask.unsqueeze(-1))
+        m_p = torch.randn(3, 8, t_x)
+        expected = torch.matmul(attn.squeeze(1), m_p.transpose(1, 2)).transpose(1, 2)
+        index, valid = commons.duration_to_index(w_ceil, y_mask.size(-1))
+        assert torch.equal(commons.expand_by_index(m_p, index, valid), expected)
+
+
+def test_infer_return_attn():
+    model, _ = build_model()
+    bert, ja_bert, x, x_lengths, tone, language = utils.pad_text_for_tts_infer([random_text_inputs(n) for n in (21, 9)])
+    sid = torch.LongTensor([0, 0])
+    args = (x, x_lengths, sid, tone, language, bert, ja_bert)
+    with torch.no_grad():
+        o, attn, y_mask, _ = model.infer(*args, noise_scale=0, sdp_ratio=0)
+        o_attn, attn, _, _ = model.infer(*args, noise_scale=0, sdp_ratio=0, return_attn=True)
+    assert torch.equal(o, o_attn)
+    assert attn.shape == (2, 1, y_mask.size(-1), x.size(-1))
+    # every frame of an entry is aligned to exactly one phone
+    assert torch.equal(attn.sum(-1), y_mask)
+
+
+def test_unused_bert_features_can_be_omitted():
+    model, _ = build_model()
+    inputs = [random_text_inputs(n) for n in (21, 9)]
+    # EN-like inputs: only ja_bert is used, bert is None or zeros
+    omitted = [(None,) + item[1:] for item in inputs]
+    sid = torch.LongTensor([0, 0])
+    with torch.no_grad():
+        o, _, _, _ = model.infer(*reorder(utils.pad_text_for_tts_infer(inputs), sid), noise_scale=0, sdp_ratio=0)
+        padded = utils.pad_text_for_tts_infer(omitted)
+        assert padded[0] is None
+        o_omitted, _, _, _ = model.infer(*reorder(padded, sid), noise_scale=0, sdp_ratio=0)
+    assert torch.equal(o, o_omitted)
+
+
+def test_zero_weight_duration_predictor_is_skipped():
+    model, _ = build_model()
+    calls = []
+    model.sdp.register_forward_hook(lambda *_: calls.append('sdp'))
+    model.dp.register_forward_hook(lambda *_: calls.append('dp'))
+    args = reorder(utils.pad_text_for_tts_infer([random_text_inputs(21)]), torch.LongTensor([0]))
+    with torch.no_grad():
+        for sdp_ratio, expected in [(0, ['dp']), (1, ['sdp']), (0.2, ['sdp', 'dp'])]:
+            calls.clear()
+            model.infer(*args, noise_scale=0, sdp_ratio=sdp_ratio)
+            assert calls == expected
+
+
+def test_infer_positional_arguments():
+    model, hps = build_model()
+    args = reorder(utils.pad_text_for_tts_infer([random_text_inputs(21)]), torch.LongTensor([0]))
+    with torch.no_grad():
+        # noise_scale, length_scale, noise_scale_w, max_len, sdp_ratio, as before dec_chunk_size was added
+        o, _, _, _ = model.infer(*args, 0, 1, 0.8, 20, 0)
+        expected, _, _, _ = model.infer(*args, noise_scale=0, max_len=20, sdp_ratio=0)
+        chunks = list(model.infer_iter(*args, 0, 1, 0.8, 20, 0))
+    assert o.size(-1) == 20 * hps.data.hop_length
+    assert torch.equal(o, expected)
+    assert torch.allclose(torch.cat(chunks, -1), o, atol=1e-5)
+
+
+if __name__ == '__main__':
+    test_batched_infer_matches_per_sentence()
+    test_chunked_decoder_matches_full_decoding()
+    test_index_expansion_matches_attention_path()
+    test_infer_return_attn()
+    test_unused_bert_features_can_be_omitted()
+    test_zero_weight_duration_predictor_is_skipped()
+    test_infer_positional_arguments()
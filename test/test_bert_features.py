@@ -0,0 +1,83 @@
+import os
+import tempfile
+
+import torch
+from transformers import BertConfig, BertForMaskedLM, BertTokenizer
+
+from melo.commons import intersperse_word2ph
+from melo.text.bert_utils import (
+    load_bert_encoder, expand_to_phones, get_phone_level_features, get_tokenizer, TokenizedText
+)
+
+
+VOCAB = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]', 'the', 'cat', 'sat', 'on', 'a', 'mat', 'dog', 'ran', '.', ',']
+
+
+def save_tiny_bert(path):
+    with open(os.path.join(path, 'vocab.txt'), 'w') as f:
+        f.write('\n'.join(VOCAB))
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=100, hidden_size=32, num_hidden_layers=6, num_attention_heads=4, intermediate_size=64
+    )
+    BertForMaskedLM(config).eval().save_pretrained(path)
+
+
+def test_truncated_encoder_matches_masked_lm_hidden_state():
+    with tempfile.TemporaryDirectory() as path:
+        save_tiny_bert(path)
+        full = BertForMaskedLM.from_pretrained(path).eval()
+        encoder = load_bert_encoder(path, 'cpu')
+    assert len(encoder.encoder.layer) == 4
+    input_ids = torch.randint(0, 100, (1, 17))
+    with torch.no_grad():
+        expected = full(input_ids=input_ids, output_hidden_states=True)['hidden_states'][-3]
+        res = encoder(input_ids=input_ids).last_hidden_state
+    assert torch.equal(res, expected)
+
+
+def test_expand_to_phones_matches_loop():
+    res = torch.randn(12, 8)
+    word2ph = intersperse_word2ph([1, 3, 0, 2, 1, 4, 2, 0, 1, 3, 2, 1])
+    expected = torch.cat([res[i].repeat(word2ph[i], 1) for i in range(len(word2ph))], dim=0).T
+    assert torch.equal(expand_to_phones(res, word2ph), expected)
+    assert expand_to_phones(res, word2ph).shape == (8, sum(word2ph))
+
+
+def test_batched_features_match_single_sentence():
+    texts = ['the cat sat on a mat.', 'a dog ran', 'the dog sat on the cat, the cat ran.']
+    with tempfile.TemporaryDirectory() as path:
+        save_tiny_bert(path)
+        tokenizer = BertTokenizer.from_pretrained(path)
+        encoder = load_bert_encoder(path, 'cpu')
+    word2phs = [intersperse_word2ph([2] * len(tokenizer(t)['input_ids'])) for t in texts]
+    batched = get_phone_level_features(encoder, tokenizer, texts, word2phs, 'cpu')
+    for text, word2ph, feature in zip(texts, word2phs, batched):
+        single = get_phone_level_features(encoder, tokenizer, [text], [word2ph], 'cpu')[0]
+        assert feature.shape == single.shape == (32, sum(word2ph))
+        assert torch.allclose(feature, single, atol=1e-5)
+
+
+def test_tokenized_text_is_reused_for_features():
+    texts = ['the cat sat on a mat.', 'a dog ran', 'the dog sat on the cat, the cat ran.']
+    with tempfile.TemporaryDirectory() as path:
+        save_tiny_bert(path)
+        tokenizer = get_tokenizer(path)
+        assert get_tokenizer(path) is tokenizer
+        encoder = load_bert_encoder(path, 'cpu')
+        tokenized = [TokenizedText(t, path) for t in texts]
+    for text, tokens in zip(texts, tokenized):
+        assert list(tokens) == tokenizer.tokenize(text)
+    assert tokenized[2].tokens_between(8, 20) == ['sat', 'on', 'the']
+    word2phs = [intersperse_word2ph([2] * (len(t) + 2)) for t in tokenized]
+    expected = get_phone_level_features(encoder, tokenizer, texts, word2phs, 'cpu')
+    res = get_phone_level_features(encoder, tokenizer, texts, word2phs, 'cpu', tokenized=tokenized)
+    for feature, e in zip(res, expected):
+        assert torch.equal(feature, e)
+
+
+if __name__ == '__main__':
+    test_truncated_encoder_matches_masked_lm_hidden_state()
+    test_expand_to_phones_matches_loop()
+    test_batched_features_match_single_sentence()
+    test_tokenized_text_is_reused_for_features()
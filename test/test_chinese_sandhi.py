@@ -0,0 +1,79 @@
+from unittest import mock
+
+import jieba
+import jieba.posseg as psg
+from pypinyin import lazy_pinyin, Style
+
+from melo.text import chinese, tone_sandhi
+from melo.text.chinese import cut_for_sandhi, get_initials_finals_sandhi
+
+SENTENCES = [
+    # polyphonic characters
+    '银行的人在街上行走。',
+    '他长大以后量了长江的长度。',
+    '这件事很重要，不要重复。',
+    '你还是把钱还给他吧。',
+    '音乐让人快乐。',
+    '我们在长城上睡觉，觉得很累。',
+    # 一 and 不 sandhi
+    '我一个人一天看一看书，一样开心。',
+    '第一名是一一对应的。',
+    '不要说不对，这不是不好。',
+    '他去不去都可以，好不好？',
+    # neutral tones, reduplication and third tone chains
+    '这个麻烦的东西你看看。',
+    '你好，展览馆里有老虎和小鸟。',
+    '我想买两把雨伞。',
+]
+
+
+def uncached_finals(word):
+    return lazy_pinyin(word, neutral_tone_with_five=True, style=Style.FINALS_TONE3)
+
+
+def uncached_g2p_words(seg):
+    """cut_for_sandhi and get_initials_finals_sandhi, on plain pypinyin and jieba calls."""
+    modifier = chinese.tone_modifier
+    with mock.patch.object(tone_sandhi, 'word_finals', uncached_finals), \
+            mock.patch.object(tone_sandhi, '_cut_for_search', lambda word: list(jieba.cut_for_search(word))):
+        seg_cut = modifier.pre_merge_for_modify(psg.lcut(seg))
+        words = []
+        for word, pos in seg_cut:
+            initials = lazy_pinyin(word, neutral_tone_with_five=True, style=Style.INITIALS)
+            finals = modifier.modified_tone(word, pos, uncached_finals(word))
+            words.append((word, pos, tuple(initials), tuple(finals)))
+    return words
+
+
+def cached_g2p_words(seg):
+    return [(word, pos) + get_initials_finals_sandhi(word, pos) for word, pos in cut_for_sandhi(seg)]
+
+
+def test_sandhi_caches_match_uncached_path():
+    cut_for_sandhi.cache_clear()
+    get_initials_finals_sandhi.cache_clear()
+    tone_sandhi.word_finals.cache_clear()
+    tone_sandhi._cut_for_search.cache_clear()
+    for sentence in SENTENCES:
+        expected = uncached_g2p_words(sentence)
+        # the first call fills the caches, the second one reads them
+        assert cached_g2p_words(sentence) == expected
+        assert cached_g2p_words(sentence) == expected
+
+
+def test_sandhi_rules_applied():
+    finals = dict((word, f) for sentence in SENTENCES for word, _, _, f in cached_g2p_words(sentence))
+    # 一 before a fourth tone becomes yi2, 不 before a fourth tone becomes bu2
+    assert finals['一个'][0] == 'i2'
+    assert finals['不要'][0] == 'u2'
+    assert finals['不是'][0] == 'u2'
+    # 一 before other tones becomes yi4, as an ordinal it keeps yi1
+    assert finals['一天'][0] == 'i4'
+    assert finals['第一名'][1] == 'i1'
+    # 不 between a reduplicated word is neutral
+    assert finals['去不去'][1] == 'u5'
+
+
+if __name__ == '__main__':
+    test_sandhi_caches_match_uncached_path()
+    test_sandhi_rules_applied()
@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+from melo.text.english_utils.cmu_lexicon import CMULexicon, write_lexicon
+
+
+G2P_DICT = {
+    'HELLO': [['HH', 'AH0'], ['L', 'OW1']],
+    'HELL': [['HH', 'EH1', 'L']],
+    'A': [['AH0']],
+    'ZYWICKI': [['Z', 'IH0'], ['W', 'IH1'], ['K', 'IY0']],
+    "DON'T": [['D', 'OW1', 'N', 'T']],
+    'CAFÉ': [['K', 'AE0'], ['F', 'EY1']],
+}
+
+
+def test_lexicon_matches_dict():
+    with tempfile.TemporaryDirectory() as path:
+        write_lexicon(G2P_DICT, os.path.join(path, 'lexicon.bin'))
+        lexicon = CMULexicon(os.path.join(path, 'lexicon.bin'))
+        assert len(lexicon) == len(G2P_DICT)
+        assert dict(lexicon.items()) == G2P_DICT
+        for word, syllables in G2P_DICT.items():
+            assert word in lexicon
+            assert lexicon[word] == lexicon.get(word) == syllables
+        for word in ['HEL', 'HELLOS', 'B', '', 'ZZZ', 'CAFE']:
+            assert word not in lexicon
+            assert lexicon.get(word) is None
+
+
+if __name__ == '__main__':
+    test_lexicon_matches_dict()
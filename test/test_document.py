@@ -0,0 +1,61 @@
+import zlib
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from melo.api import TTS
+from melo.document import DocumentStats, partition_cores
+from test_batched_infer import build_model
+
+TEXT = ' '.join(f'This is sentence number {i}, which is long enough to stay a sentence.' for i in range(12))
+
+
+def text_inputs(text, length=60, n_vocab=100):
+    # the same random input for a text in every process
+    generator = torch.Generator().manual_seed(zlib.crc32(text.encode('utf-8')))
+    bert = torch.zeros(1024, length)
+    ja_bert = torch.randn(768, length, generator=generator)
+    phone = torch.randint(1, n_vocab, (length,), generator=generator)
+    tone = torch.randint(0, 16, (length,), generator=generator)
+    language = torch.randint(0, 10, (length,), generator=generator)
+    return bert, ja_bert, phone, tone, language
+
+
+class FakeTTS(TTS):
+    """TTS on the random test model, with a frontend that needs no BERT."""
+
+    def __init__(self):
+        nn.Module.__init__(self)
+        self.model, self.hps = build_model()
+        self.device = 'cpu'
+        self.language = 'EN'
+
+    def get_text_inputs_batch(self, texts):
+        return [text_inputs(t) for t in texts]
+
+    def worker_factory(self):
+        return FakeTTS
+
+
+def test_partition_cores():
+    assert partition_cores(list(range(8)), 3) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    assert partition_cores([0, 1], 3) == [[0], [1], [0]]
+
+
+def test_tts_document_matches_tts_to_file():
+    tts = FakeTTS()
+    kwargs = dict(sdp_ratio=0, noise_scale=0, quiet=True)
+    audio = tts.tts_to_file(TEXT, 0, **kwargs)
+    stats = DocumentStats()
+    document_audio = tts.tts_document(TEXT, 0, n_workers=2, shard_size=1, stats=stats, **kwargs)
+    np.testing.assert_allclose(document_audio, audio, atol=1e-5)
+    assert len(stats.workers) == 2
+    assert sum(w['sentences'] for w in stats.workers.values()) == len(tts.split_sentences_into_pieces(TEXT, 'EN', quiet=True))
+    assert abs(stats.audio_seconds - len(audio) / tts.hps.data.sampling_rate) < 1e-6
+    assert stats.throughput > 0
+
+
+if __name__ == '__main__':
+    test_partition_cores()
+    test_tts_document_matches_tts_to_file()
@@ -0,0 +1,19 @@
+from melo.text.es_phonemizer import es_to_ipa
+from melo.text.fr_phonemizer import fr_to_ipa
+
+
+def test_spanish_sentence_matches_word_by_word():
+    words = ['¿', 'y', 'a', 'quien', 'echaria', 'de', 'menos', ',', 'en', 'el', 'mundo', '?']
+    assert es_to_ipa.words2ipa(words) == [es_to_ipa.es2ipa(w) for w in words]
+
+
+def test_punctuation_falls_back_to_word_by_word():
+    words = ['l', "'", 'homme', 'part', '.']
+    ipas = fr_to_ipa.phonemizer.phonemize_words(words)
+    assert ipas[1] is None and ipas[4] is None
+    assert fr_to_ipa.words2ipa(words) == [fr_to_ipa.fr2ipa(w) for w in words]
+
+
+if __name__ == '__main__':
+    test_spanish_sentence_matches_word_by_word()
+    test_punctuation_falls_back_to_word_by_word()
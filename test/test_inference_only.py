@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import torch
+
+from melo.api import TTS
+from melo.models import SynthesizerTrn
+from melo.text import num_languages, num_tones, symbols
+
+
+def save_random_model(directory):
+    """A config and a checkpoint of random weights, as TTS loads them."""
+    config_path = os.path.join(os.path.dirname(__file__), '..', 'melo', 'configs', 'config.json')
+    config = json.load(open(config_path))
+    config.update(symbols=symbols, num_tones=num_tones, num_languages=num_languages)
+    config['data']['n_speakers'] = 4
+    torch.manual_seed(0)
+    model = SynthesizerTrn(
+        len(symbols),
+        config['data']['filter_length'] // 2 + 1,
+        config['train']['segment_size'] // config['data']['hop_length'],
+        n_speakers=4,
+        num_tones=num_tones,
+        num_languages=num_languages,
+        **config['model'],
+    )
+    config_path = os.path.join(directory, 'config.json')
+    ckpt_path = os.path.join(directory, 'checkpoint.pth')
+    json.dump(config, open(config_path, 'w'))
+    torch.save({'model': model.state_dict(), 'iteration': 0}, ckpt_path)
+    return config_path, ckpt_path
+
+
+def random_inputs(length, bert=False):
+    """EN-like inputs, only ja_bert is used; or ZH-like with bert."""
+    return (
+        torch.randn(1024, length) if bert else None,
+        None if bert else torch.randn(768, length),
+        torch.randint(1, len(symbols), (length,)),
+        torch.randint(0, num_tones, (length,)),
+        torch.randint(0, num_languages, (length,)),
+    )
+
+
+def test_inference_only_model():
+    with tempfile.TemporaryDirectory() as directory:
+        config_path, ckpt_path = save_random_model(directory)
+        full = TTS('EN', device='cpu', config_path=config_path, ckpt_path=ckpt_path)
+        small = TTS('EN', device='cpu', config_path=config_path, ckpt_path=ckpt_path, inference_only=True)
+    assert small.model.enc_q is None
+    n_full = sum(p.numel() for p in full.model.parameters())
+    n_small = sum(p.numel() for p in small.model.parameters())
+    assert n_small < n_full
+    inputs = [random_inputs(30)]
+    torch.manual_seed(0)
+    expected = full.infer_batch(inputs, 0, sdp_ratio=0, noise_scale=0)
+    torch.manual_seed(0)
+    audio = small.infer_batch(inputs, 0, sdp_ratio=0, noise_scale=0)
+    assert torch.equal(torch.from_numpy(audio[0]), torch.from_numpy(expected[0]))
+
+
+
+def test_inference_only_strict_loading():
+    with tempfile.TemporaryDirectory() as directory:
+        config_path, ckpt_path = save_random_model(directory)
+        checkpoint = torch.load(ckpt_path)
+        # a checkpoint with a key the model does not have still fails to load
+        checkpoint['model']['dec.renamed.weight'] = torch.zeros(1)
+        torch.save(checkpoint, ckpt_path)
+        try:
+            TTS('EN', device='cpu', config_path=config_path, ckpt_path=ckpt_path, inference_only=True)
+        except RuntimeError as e:
+            assert 'dec.renamed.weight' in str(e)
+        else:
+            raise AssertionError('unexpected key was ignored')
+
+
+def test_optimize_for_inference():
+    with tempfile.TemporaryDirectory() as directory:
+        config_path, ckpt_path = save_random_model(directory)
+        reference = TTS('EN', device='cpu', config_path=config_path, ckpt_path=ckpt_path, optimize=False)
+        optimized = TTS('EN', device='cpu', config_path=config_path, ckpt_path=ckpt_path)
+    assert not any(p.requires_grad for p in optimized.model.parameters())
+    assert not any(name.endswith('weight_g') for name, _ in optimized.model.named_parameters())
+    torch.manual_seed(0)
+    inputs = [random_inputs(30), random_inputs(41, bert=True)]
+    expected = reference.infer_batch(inputs, 0, sdp_ratio=0, noise_scale=0)
+    audio = optimized.infer_batch(inputs, 0, sdp_ratio=0, noise_scale=0)
+    for a, b in zip(audio, expected):
+        np.testing.assert_allclose(a, b, atol=1e-5)
+    # TTS already optimized the model, calling it again changes nothing
+    optimized.optimize_for_inference()
+    optimized.model.enc_p.fold_embeddings()
+    again = optimized.infer_batch(inputs, 0, sdp_ratio=0, noise_scale=0)
+    for a, b in zip(again, audio):
+        np.testing.assert_array_equal(a, b)
+
+
+if __name__ == '__main__':
+    test_inference_only_model()
+    test_inference_only_strict_loading()
+    test_optimize_for_inference()
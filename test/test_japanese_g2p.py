@@ -0,0 +1,68 @@
+import random
+import re
+
+from melo.text import japanese
+from melo.text.japanese import kata2phoneme, token_phonemes
+
+# the conversion as the rule table reads: at each position the longest
+# matching rule, any other character passes through unchanged
+_RULES = dict(rule.split('/') for rule in japanese._CONVRULES)
+_RULE_RX = re.compile('|'.join(re.escape(k) for k in sorted(_RULES, key=len, reverse=True)))
+
+WORDS = [
+    'コンニチハ', 'キョウ', 'ガッコウ', 'シャシン', 'チェック', 'ティーカップ', 'ヴァイオリン',
+    'ファミリー', 'デュエット', 'ウィスキー', 'トーキョー', 'ッ', 'ン', 'ー', '？', '・',
+    'アァ', 'イェーイ', 'キャット、ドッグ', 'abc', ' スペース ',
+]
+
+
+def reference_kata2phoneme(text):
+    text = text.strip()
+    res = []
+    i = 0
+    while i < len(text):
+        m = _RULE_RX.match(text, i)
+        if m is None:
+            res.append(text[i])
+            i += 1
+        else:
+            res += _RULES[m.group()].split(' ')[1:]
+            i = m.end()
+    return res
+
+
+def katakana_corpus(n=5000, seed=0):
+    rng = random.Random(seed)
+    # every rule on its own, and random strings of rule keys and other characters
+    letters = sorted(set(''.join(_RULES))) + list('ー、。!? aA1')
+    corpus = list(_RULES) + WORDS
+    for _ in range(n):
+        corpus.append(''.join(rng.choice(letters) for _ in range(rng.randint(1, 12))))
+    return corpus
+
+
+def test_kata2phoneme_matches_rule_table():
+    for text in katakana_corpus():
+        assert kata2phoneme(text) == reference_kata2phoneme(text), text
+
+
+def test_token_phonemes():
+    token_phonemes.cache_clear()
+    for word in WORDS:
+        phonemes = token_phonemes(word)
+        assert isinstance(phonemes, tuple)
+        assert list(phonemes) == kata2phoneme(word)
+    # the second pass is served from the cache
+    for word in WORDS:
+        assert token_phonemes(word) == tuple(kata2phoneme(word))
+    info = token_phonemes.cache_info()
+    assert info.hits == len(WORDS) and info.misses == len(set(WORDS))
+    # kata2phoneme is not affected by the shared tuples
+    phonemes = kata2phoneme('ガッコウ')
+    phonemes.append('x')
+    assert token_phonemes('ガッコウ')[-1] != 'x'
+
+
+if __name__ == '__main__':
+    test_kata2phoneme_matches_rule_table()
+    test_token_phonemes()
@@ -0,0 +1,103 @@
+import marshal
+import os
+import tempfile
+from unittest import mock
+
+import jieba
+
+from melo.text.chinese import jieba_cache_path, warmup_jieba
+
+SENTENCES = [
+    '我们去北京天安门看升旗仪式。',
+    '长江大桥的长度是多少米？',
+    '他一边走一边唱着不知名的歌。',
+    '人工智能正在改变语音合成的研究方向。',
+]
+
+
+def reference_tokenizer():
+    reference = jieba.Tokenizer()
+    reference.initialize()
+    return reference
+
+
+def test_warmup_jieba_round_trip():
+    reference = reference_tokenizer()
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, 'melo', 'jieba.cache')
+        built = jieba.Tokenizer()
+        warmup_jieba(cache_path, tokenizer=built)
+        # the cache directory is created private to this user, and no temp file is left in it
+        assert os.stat(os.path.dirname(cache_path)).st_mode & 0o777 == 0o700
+        assert os.listdir(os.path.dirname(cache_path)) == ['jieba.cache']
+        assert os.stat(cache_path).st_mode & 0o077 == 0
+        loaded = jieba.Tokenizer()
+        with mock.patch.object(loaded, 'initialize', side_effect=AssertionError('cache not used')):
+            warmup_jieba(cache_path, tokenizer=loaded)
+        assert loaded.initialized
+        assert loaded.total == reference.total
+    for sentence in SENTENCES:
+        assert loaded.lcut(sentence) == built.lcut(sentence) == reference.lcut(sentence)
+
+
+def test_warmup_jieba_corrupt_cache():
+    reference = reference_tokenizer()
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, 'jieba.cache')
+        with open(cache_path, 'wb') as f:
+            f.write(marshal.dumps(({'北京': 1}, 1))[:-3])
+        tokenizer = jieba.Tokenizer()
+        warmup_jieba(cache_path, tokenizer=tokenizer)
+        assert tokenizer.initialized
+        assert tokenizer.total == reference.total
+        # the truncated file was replaced by a good one
+        loaded = jieba.Tokenizer()
+        warmup_jieba(cache_path, tokenizer=loaded)
+        assert loaded.total == reference.total
+
+
+def test_warmup_jieba_rejects_writable_cache():
+    reference = reference_tokenizer()
+    with tempfile.TemporaryDirectory() as directory:
+        cache_path = os.path.join(directory, 'jieba.cache')
+        with open(cache_path, 'wb') as f:
+            marshal.dump(({'北京': 1}, 1), f)
+        # a file others can write to is not trusted
+        os.chmod(cache_path, 0o666)
+        tokenizer = jieba.Tokenizer()
+        warmup_jieba(cache_path, tokenizer=tokenizer)
+        assert tokenizer.total == reference.total
+        # neither is a good file in a directory others can write to
+        os.chmod(directory, 0o777)
+        with open(cache_path, 'wb') as f:
+            marshal.dump(({'北京': 1}, 1), f)
+        os.chmod(cache_path, 0o600)
+        tokenizer = jieba.Tokenizer()
+        warmup_jieba(cache_path, tokenizer=tokenizer)
+        assert tokenizer.total == reference.total
+
+
+def test_jieba_cache_path():
+    with tempfile.TemporaryDirectory() as directory:
+        with mock.patch.dict(os.environ, {'XDG_CACHE_HOME': directory}):
+            path = jieba_cache_path()
+    assert os.path.dirname(path) == os.path.join(directory, 'melo')
+    assert jieba.__version__ in os.path.basename(path)
+
+
+def test_warmup_jieba_failed_write():
+    with tempfile.TemporaryDirectory() as directory:
+        tokenizer = jieba.Tokenizer()
+        # the cache cannot be put in place, the temp file is removed and the tokenizer still loads
+        with mock.patch('os.replace', side_effect=OSError):
+            warmup_jieba(os.path.join(directory, 'jieba.cache'), tokenizer=tokenizer)
+        assert tokenizer.initialized
+        assert os.listdir(directory) == []
+
+
+if __name__ == '__main__':
+    test_warmup_jieba_round_trip()
+    test_warmup_jieba_corrupt_cache()
+    test_warmup_jieba_rejects_writable_cache()
+    test_jieba_cache_path()
+    test_warmup_jieba_failed_write()
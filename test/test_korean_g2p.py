@@ -0,0 +1,33 @@
+from melo.text import korean
+
+
+def test_align_pronunciation():
+    text = '전 한 일의 의미를 잘 압니다.'
+    pron = '전 하 니릐 의미를 자 람니다.'
+    words = ['전', '한', '일', '의', '의미', '를', '잘', '압니다', '.']
+    assert korean.align_pronunciation(words, text, pron) == ['전', '하', '니', '릐', '의미', '를', '자', '람니다', '.']
+
+
+def test_unaligned_words_are_none():
+    # '10' is read as one syllable, the other words still align
+    text = '사과 10개'
+    pron = '사과 열개'
+    assert korean.align_pronunciation(['사과', '10', '개', '[UNK]'], text, pron) == ['사과', None, None, None]
+
+
+def test_sentence_level_g2p():
+    norm_text = korean.text_normalize('한국 음식을 먹어보고 싶어요.')
+    korean.sentence_level_g2p = False
+    phones, tones, word2ph = korean.g2p(norm_text)
+    korean.sentence_level_g2p = True
+    phones_sentence, _, word2ph_sentence = korean.g2p(norm_text)
+    assert len(word2ph) == len(word2ph_sentence)
+    assert sum(word2ph_sentence) == len(phones_sentence)
+    # '한국 음식' is pronounced '한구 금식'
+    assert ''.join(phones_sentence[1:-1]).startswith(korean.korean_text_to_phonemes('한구금'))
+
+
+if __name__ == '__main__':
+    test_align_pronunciation()
+    test_unaligned_words_are_none()
+    test_sentence_level_g2p()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+from melo.text.english_utils.oov_cache import OOVCache
+
+
+class CountingG2p:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, word):
+        self.calls.append(word)
+        return [c.upper() + '1' for c in word]
+
+
+def test_lru_is_bounded():
+    g2p = CountingG2p()
+    cache = OOVCache(g2p, maxsize=2)
+    assert cache('ab') == ['A1', 'B1']
+    cache('cd')
+    cache('ab')
+    cache('ef')
+    assert list(cache._lru) == ['ab', 'ef']
+    cache('cd')
+    assert g2p.calls == ['ab', 'cd', 'ef', 'cd']
+
+
+def test_cache_file_is_shared():
+    with tempfile.TemporaryDirectory() as path:
+        path = os.path.join(path, 'oov.tsv')
+        g2p = CountingG2p()
+        writer = OOVCache(g2p, path=path)
+        writer.prewarm(['melotts', 'ok'])
+        reader = OOVCache(g2p, maxsize=1, path=path)
+        writer('zyx')
+        assert reader('melotts') == writer('melotts')
+        assert reader('zyx') == ['Z1', 'Y1', 'X1']
+        # evicted from the reader's LRU, but still read back from the file
+        assert reader('ok') == ['O1', 'K1']
+        assert reader('melotts') == ['M1', 'E1', 'L1', 'O1', 'T1', 'T1', 'S1']
+        assert g2p.calls == ['melotts', 'ok', 'zyx']
+
+
+if __name__ == '__main__':
+    test_lru_is_bounded()
+    test_cache_file_is_shared()
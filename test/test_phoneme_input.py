@@ -0,0 +1,69 @@
+import numpy as np
+import torch
+
+from melo.text.symbols import symbols
+from test_tts_iter import build_tts
+
+# an English sentence as clean_text returns it
+PHONES = ['_', 'hh', 'ah', 'l', 'ow', 'w', 'er', 'l', 'd', '.', '_']
+TONES = [0, 0, 2, 0, 3, 0, 3, 0, 0, 0, 0]
+WORD2PH = [1, 4, 4, 1, 1]
+
+
+def build_phoneme_tts():
+    tts = build_tts()
+    # the random test model has 100 symbol ids and 16 tones
+    tts.symbol_to_id = {s: i % 100 for i, s in enumerate(symbols)}
+    tts.hps.num_tones = 16
+    return tts
+
+
+def test_phoneme_inputs():
+    tts = build_phoneme_tts()
+    bert, ja_bert, phone, tone, language = tts.get_phoneme_inputs(PHONES, TONES, WORD2PH)
+    # interspersed with blanks
+    assert len(phone) == 2 * len(PHONES) + 1
+    assert phone[1::2].tolist() == [tts.symbol_to_id[p] for p in PHONES]
+    # without BERT both features are zeros, which are not allocated
+    assert bert is None and ja_bert is None
+    features = torch.randn(768, len(phone))
+    bert, ja_bert, _, _, _ = tts.get_phoneme_inputs(PHONES, TONES, WORD2PH, bert=features)
+    assert bert is None
+    assert torch.equal(ja_bert, features)
+
+
+def test_tts_phonemes():
+    tts = build_phoneme_tts()
+    # word2ph is optional, only BERT needs it; the sentences are repeated to be long enough for the loudness normalization
+    sentences = [
+        dict(phones=PHONES[:-1] * 4 + ['_'], tones=TONES[:-1] * 4 + [0], word2ph=WORD2PH[:-1] * 4 + [1]),
+        dict(phones=PHONES[:-1] * 6 + ['_'], tones=TONES[:-1] * 6 + [0]),
+    ]
+    audio = tts.tts_phonemes(sentences, 0, sdp_ratio=0, noise_scale=0)
+    batched = tts.tts_phonemes(sentences, 0, sdp_ratio=0, noise_scale=0, batch_size=2)
+    assert audio.dtype == np.float32 and len(audio) > 0
+    np.testing.assert_allclose(audio, batched, atol=1e-4)
+
+
+def test_invalid_phonemes():
+    tts = build_phoneme_tts()
+    cases = [
+        dict(phones=PHONES[:-1] + ['not-a-phone'], tones=TONES),
+        dict(phones=PHONES, tones=TONES[:-1]),
+        dict(phones=PHONES, tones=TONES, word2ph=WORD2PH[:-1]),
+        dict(phones=PHONES, tones=[20] * len(PHONES)),
+        dict(phones=PHONES, tones=TONES, bert=torch.zeros(768, len(PHONES))),
+    ]
+    for case in cases:
+        try:
+            tts.get_phoneme_inputs(**case)
+        except ValueError:
+            pass
+        else:
+            assert False, case
+
+
+if __name__ == '__main__':
+    test_phoneme_inputs()
+    test_tts_phonemes()
+    test_invalid_phonemes()
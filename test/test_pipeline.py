@@ -0,0 +1,61 @@
+import threading
+import time
+
+from melo.pipeline import PipelineStats, prefetch, timed
+
+
+def test_prefetch_runs_ahead():
+    produced = []
+
+    def items():
+        for i in range(10):
+            produced.append(i)
+            yield i
+    it = prefetch(items(), maxsize=2)
+    assert next(it) == 0
+    time.sleep(0.2)
+    # the item being handed over, plus the ones in the queue
+    assert len(produced) == 4
+    assert list(it) == list(range(1, 10))
+
+
+def test_prefetch_raises_worker_errors():
+    def items():
+        yield 1
+        raise ValueError('frontend failed')
+    it = prefetch(items())
+    assert next(it) == 1
+    try:
+        next(it)
+    except ValueError as e:
+        assert str(e) == 'frontend failed'
+    else:
+        assert False
+
+
+def test_prefetch_close_stops_worker():
+    it = prefetch(iter(range(1000)), maxsize=1)
+    next(it)
+    it.close()
+    time.sleep(0.3)
+    assert not any(t.name == 'melo-frontend' for t in threading.enumerate())
+
+
+def test_timed():
+    stats = PipelineStats()
+
+    def items():
+        for i in range(3):
+            time.sleep(0.01)
+            yield i
+    assert list(timed(items(), stats, 'frontend')) == [0, 1, 2]
+    assert stats.items['frontend'] == 3
+    assert 0.03 <= stats.busy['frontend'] < stats.wall
+    assert 'frontend' in str(stats)
+
+
+if __name__ == '__main__':
+    test_prefetch_runs_ahead()
+    test_prefetch_raises_worker_errors()
+    test_prefetch_close_stops_worker()
+    test_timed()
@@ -0,0 +1,46 @@
+from melo.split_utils import split_sentence, split_sentence_stream, txtsplit
+
+EN_TEXT = ("I didn’t know what to do. I said please kill her because it would be better than being kidnapped,” "
+           "Ben, whose surname CNN is not using for security concerns, said on Wednesday. “It’s a nightmare.")
+ZH_TEXT = "好的，我来给你讲一个故事吧。从前有一个小姑娘，她叫做小红。小红非常喜欢在森林里玩耍，她经常会和她的小伙伴们一起去探险。好。"
+
+
+def fragments(text, size):
+    return [text[i: i + size] for i in range(0, len(text), size)]
+
+
+def test_txtsplit():
+    text = 'One. Two, three! "Four. Five." Six\n\nseven? ' * 20
+    chunks = txtsplit(text, 30, 60)
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    assert ''.join(''.join(chunks).split()) == ''.join(text.split())
+    assert txtsplit('a' * 250, 100, 200) == ['a' * 100, 'a' * 150]
+    assert txtsplit(' . , ') == []
+
+
+def test_stream_matches_whole_text():
+    for language, text in [('EN', EN_TEXT * 10), ('ZH', ZH_TEXT * 5)]:
+        sentences = split_sentence(text, language_str=language)
+        for size in [1, 3, 7, 100]:
+            assert list(split_sentence_stream(fragments(text, size), language_str=language)) == sentences
+
+
+def test_stream_emits_complete_sentences():
+    consumed = []
+
+    def fragments_seen():
+        for fragment in fragments(ZH_TEXT, 4):
+            consumed.append(fragment)
+            yield fragment
+    stream = split_sentence_stream(fragments_seen(), language_str='ZH')
+    assert next(stream) == '好的, 我来给你讲一个故事吧.'
+    # it is held back only until the next sentence is complete
+    assert '小伙伴' not in ''.join(consumed)
+    # the short last sentence is merged into the one before it
+    assert list(stream)[-1].endswith('一起去探险. 好.')
+
+
+if __name__ == '__main__':
+    test_txtsplit()
+    test_stream_matches_whole_text()
+    test_stream_emits_complete_sentences()
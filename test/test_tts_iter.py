@@ -0,0 +1,131 @@
+import asyncio
+
+import numpy as np
+import torch.nn as nn
+
+from melo.api import TTS
+from melo.pipeline import PipelineStats
+from test_batched_infer import build_model, random_text_inputs
+
+
+def build_tts(language='EN'):
+    model, hps = build_model()
+    tts = TTS.__new__(TTS)
+    nn.Module.__init__(tts)
+    tts.model = model
+    tts.hps = hps
+    tts.device = 'cpu'
+    tts.language = language
+    # bypass the text frontend, one fixed random input per sentence
+    inputs = {}
+    tts.get_text_inputs_batch = lambda texts: [inputs.setdefault(t, random_text_inputs(120)) for t in texts]
+    return tts
+
+
+# long enough for split_sentence to cut it into several pieces, short texts become a single one
+TEXT = ' '.join([
+    'The first sentence is here, and it goes on for a while so that the text is long enough to be split.',
+    'A second one follows it, also written with enough words to fill a good part of a piece.',
+    'Then comes a third sentence, which talks about nothing in particular but takes up some room.',
+    'The fourth sentence keeps going in the same way, adding more words to the growing text.',
+    'A fifth sentence is added here so that the splitter has plenty of text to work with.',
+    'The sixth sentence mentions the weather, which is mild and pleasant for the time of year.',
+    'The seventh sentence is about a cat that sleeps on the windowsill in the afternoon sun.',
+    'The eighth sentence describes a quiet street with a bakery at the corner and a small park.',
+    'And finally, the ninth sentence ends the text.',
+])
+
+
+def test_text_splits_into_pieces():
+    assert len(TTS.split_sentences_into_pieces(TEXT, 'EN', quiet=True)) >= 3
+
+
+def test_tts_iter_concatenates_to_tts_to_file():
+    tts = build_tts()
+    kwargs = dict(sdp_ratio=0, noise_scale=0, quiet=True)
+    chunks = list(tts.tts_iter(TEXT, 0, **kwargs))
+    audio = tts.tts_to_file(TEXT, 0, **kwargs)
+    assert len(chunks) == len(tts.split_sentences_into_pieces(TEXT, 'EN', quiet=True))
+    assert all(chunk.dtype == np.float32 for chunk in chunks)
+    np.testing.assert_allclose(np.concatenate(chunks), audio, atol=1e-6)
+
+
+def test_tts_iter_int16():
+    tts = build_tts()
+    chunks = list(tts.tts_iter(TEXT, 0, sdp_ratio=0, noise_scale=0, quiet=True, dtype='int16'))
+    assert all(chunk.dtype == np.int16 for chunk in chunks)
+
+
+def test_tts_iter_chunked_streams_sub_sentence():
+    tts = build_tts()
+    chunks = list(tts.tts_iter(TEXT, 0, sdp_ratio=0, noise_scale=0, quiet=True, chunk_size=8))
+    n_sentences = len(tts.split_sentences_into_pieces(TEXT, 'EN', quiet=True))
+    assert len(chunks) > 2 * n_sentences
+    assert all(chunk.dtype == np.float32 for chunk in chunks)
+
+
+def test_tts_iter_chunked_several_batches():
+    tts = build_tts()
+    n_sentences = len(tts.split_sentences_into_pieces(TEXT, 'EN', quiet=True))
+    silence = int(tts.hps.data.sampling_rate * 0.05)
+    for batch_size in [1, 2]:
+        chunks = list(tts.tts_iter(TEXT, 0, sdp_ratio=0, noise_scale=0, quiet=True, chunk_size=8, batch_size=batch_size))
+        # every sentence of every batch is streamed and followed by its silence
+        silences = [c for c in chunks if len(c) == silence and not c.any()]
+        assert len(silences) == n_sentences
+
+
+def test_tts_iter_prefetch():
+    tts = build_tts()
+    kwargs = dict(sdp_ratio=0, noise_scale=0, quiet=True)
+    chunks = list(tts.tts_iter(TEXT, 0, **kwargs))
+    stats = PipelineStats()
+    prefetched = list(tts.tts_iter(TEXT, 0, prefetch=1, stats=stats, **kwargs))
+    assert len(prefetched) == len(chunks)
+    for a, b in zip(prefetched, chunks):
+        np.testing.assert_allclose(a, b, atol=1e-6)
+    assert stats.items['frontend'] == stats.items['acoustic'] == len(chunks)
+    assert set(stats.utilization()) == {'frontend', 'acoustic'}
+
+
+def fragments(text, size=5):
+    return [text[i: i + size] for i in range(0, len(text), size)]
+
+
+def test_tts_stream_matches_tts_iter():
+    tts = build_tts()
+    kwargs = dict(sdp_ratio=0, noise_scale=0, quiet=True)
+    chunks = list(tts.tts_iter(TEXT, 0, **kwargs))
+    streamed = list(tts.tts_stream(iter(fragments(TEXT)), 0, **kwargs))
+    assert len(streamed) == len(chunks)
+    for a, b in zip(streamed, chunks):
+        np.testing.assert_allclose(a, b, atol=1e-6)
+
+
+def test_tts_stream_async():
+    tts = build_tts()
+    kwargs = dict(sdp_ratio=0, noise_scale=0, quiet=True)
+    chunks = list(tts.tts_stream(fragments(TEXT), 0, **kwargs))
+
+    async def text_stream():
+        for fragment in fragments(TEXT):
+            await asyncio.sleep(0)
+            yield fragment
+
+    async def collect():
+        return [chunk async for chunk in tts.tts_stream_async(text_stream(), 0, **kwargs)]
+    streamed = asyncio.run(collect())
+    assert len(streamed) == len(chunks)
+    for a, b in zip(streamed, chunks):
+        np.testing.assert_allclose(a, b, atol=1e-6)
+
+
+if __name__ == '__main__':
+    test_text_splits_into_pieces()
+    test_tts_iter_concatenates_to_tts_to_file()
+    test_tts_iter_int16()
+    test_tts_iter_chunked_streams_sub_sentence()
+    test_tts_iter_chunked_several_batches()
+    test_tts_iter_prefetch()
+    test_tts_stream_matches_tts_iter()
+    test_tts_stream_async()